@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+bench.py — Benchmarks do interpretador MiniLang
+
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+import minilang
+
+ENGINES = ('tree', 'tiered', 'closure', 'vm', 'py')
+
+# Mesmo laço com e sem a chamada: a diferença dividida por N é o custo de uma
+# chamada de função (avaliar o argumento, criar o escopo, executar o return).
+CALL_SRC = '''
+func f(x)
+    return x
+end func
+i = 0
+while i < {n}
+    f(i)
+    i += 1
+end while
+'''
+LOOP_SRC = '''
+i = 0
+while i < {n}
+    i += 1
+end while
+'''
+
+# ——— Cargas ———
+# Versões parametrizadas dos exemplos do repositório (sem input() e imprimindo
+# só o resultado final) e casos sintéticos de estresse. Cada carga gera o
+# código para um tamanho n, e n é também o número de operações usado no ops/s.
+FIB_SRC = '''
+a = 0
+b = 1
+i = 0
+while i < {n}
+    next = (a + b) % 1000000007
+    a = b
+    b = next
+    i += 1
+end while
+print(a)
+'''
+PRIME_SRC = '''
+func is_prime(n)
+    if n <= 1 or n == 2
+        return false
+    end if
+    i = 2
+    while i * i <= n
+        rem = n % i
+        if rem == 0
+            return false
+        end if
+        i = i + 1
+    end while
+    return true
+end func
+count = 0
+k = 0
+while k < {n}
+    if is_prime(k)
+        count += 1
+    end if
+    k += 1
+end while
+print(count)
+'''
+FATORIAL_SRC = '''
+result = 1
+i = 1
+while i <= {n}
+    result *= i
+    i += 1
+end while
+print(result % 1000000007)
+'''
+FATORIAL_REC_SRC = '''
+func fatorial(n)
+    if n < 2
+        return 1
+    end if
+    return n * fatorial(n - 1)
+end func
+j = 0
+while j < {reps}
+    r = fatorial(20)
+    j += 1
+end while
+print(r)
+'''
+RECURSION_SRC = '''
+func soma(n)
+    if n == 0
+        return 0
+    end if
+    return n + soma(n - 1)
+end func
+print(soma({n}))
+'''
+CONCAT_SRC = '''
+s = ""
+i = 0
+while i < {n}
+    s = s + "x"
+    i += 1
+end while
+print(s == "")
+'''
+
+# Acumuladores em elementos: histograma num array e contadores num objeto
+CONTADORES_SRC = '''
+hist = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+cont = {{"par": 0, "impar": 0}}
+nomes = ["par", "impar"]
+i = 0
+while i < {n}
+    hist[i % 10] += i
+    cont[nomes[i % 2]] += 1
+    i += 1
+end while
+print(hist[9], cont["par"])
+'''
+
+def soma_array_src(n):
+    return f'''
+arr = [{', '.join(str(i) for i in range(n))}]
+sum = 0
+i = 0
+while i < {n}
+    sum += arr[i]
+    i += 1
+end while
+print(sum)
+'''
+
+def soma_for_src(n):
+    # soma_array percorrida com for-in em vez de índice
+    return f'''
+arr = [{', '.join(str(i) for i in range(n))}]
+sum = 0
+for x in arr
+    sum += x
+end for
+print(sum)
+'''
+
+def array_src(n):
+    return f'''
+pares = [{', '.join(f'[{i}, {i * 2}]' for i in range(n))}]
+total = 0
+i = 0
+while i < {n}
+    total += pares[i][1] - pares[i][0]
+    i += 1
+end while
+print(total)
+'''
+
+def object_src(n):
+    return f'''
+obj = {{{', '.join(f'"k{i}": {i}' for i in range(n))}}}
+total = 0
+i = 0
+while i < {n}
+    total += obj["k" + i]
+    i += 1
+end while
+print(total)
+'''
+
+def big_source(n):
+    # Script gerado por máquina com n linhas, para medir só Lexer/Parser
+    out = []
+    for i in range(n):
+        k = i % 10
+        if k == 0: out.append(f'func f{i}(a, b)')
+        elif k in (1, 2): out.append(f'    x = a * {i} + b - (a / 3)  # linha {i}')
+        elif k == 3: out.append('    if x > 10 && a != b')
+        elif k == 4: out.append('        print("grande", x)')
+        elif k == 5: out.append('    end if')
+        elif k == 6: out.append('    return x')
+        elif k == 7: out.append('end func')
+        elif k == 8: out.append(f'v{i} = [1, 2, {i}]')
+        else: out.append(f'o{i} = {{"a": {i}, "b": "texto"}}')
+    return '\n'.join(out) + '\n'
+
+def numarray_src(n):
+    # Mesma soma de soma_array, mas com operações vetoriais sobre numarray
+    return f'''
+arr = numarray([{', '.join(str(i) for i in range(n))}])
+total = sum(arr * 2 + 1) - len(arr)
+print(total)
+'''
+
+# nome -> (gera o código, n padrão, modos; None = todos)
+WORKLOADS = {
+    'fib':                (lambda n: FIB_SRC.format(n=n), 200000, None),
+    'prime':              (lambda n: PRIME_SRC.format(n=n), 20000, None),
+    'fatorial':           (lambda n: FATORIAL_SRC.format(n=n), 5000, None),
+    'fatorial_recursivo': (lambda n: FATORIAL_REC_SRC.format(reps=n // 20), 100000, None),
+    'soma_array':         (soma_array_src, 100000, None),
+    'soma_for':           (soma_for_src, 100000, None),
+    'numarray':           (numarray_src, 100000, None),
+    'recursao_profunda':  (lambda n: RECURSION_SRC.format(n=n), 200000, ('vm',)),
+    'concat_string':      (lambda n: CONCAT_SRC.format(n=n), 20000, None),
+    'contadores':         (lambda n: CONTADORES_SRC.format(n=n), 100000, None),
+    'array_grande':       (array_src, 50000, None),
+    'objeto_grande':      (object_src, 50000, None),
+    'lexer':              (big_source, 200000, ()),
+    'parser':             (big_source, 200000, ()),
+}
+
+def run_script(src, engine):
+    # Saída do programa descartada; qualquer erro invalida a medida
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        minilang.run(src, engine=engine)
+    if err.getvalue():
+        raise RuntimeError(err.getvalue().strip())
+
+def front_end(name, path):
+    # Lexer/Parser lendo o arquivo em blocos, como o minilang.py faz
+    with open(path, encoding='utf-8') as f:
+        if name == 'lexer':
+            for _ in minilang.Lexer(f).tokenize(): pass
+        else:
+            minilang.Parser(minilang.Lexer(f).tokenize()).parse()
+
+def measure(fn, repeat, memory):
+    best = min(timed(fn) for _ in range(repeat))
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+def per_call(engine, n, repeat):
+    call = min(timed(lambda: run_script(CALL_SRC.format(n=n), engine)) for _ in range(repeat))
+    loop = min(timed(lambda: run_script(LOOP_SRC.format(n=n), engine)) for _ in range(repeat))
+    return (call - loop) / n * 1e9
+
+def suite(names, engines, scale, repeat, memory):
+    for name in names:
+        make, default, allowed = WORKLOADS[name]
+        n = max(1, int(default * scale))
+        src = make(n)
+        if allowed == ():
+            # No lexer, n passa a ser o número de tokens: ops/s = tokens/s
+            if name == 'lexer': n = sum(1 for _ in minilang.Lexer(src).tokenize())
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, f'{name}.ml')
+                with open(path, 'w', encoding='utf-8') as f: f.write(src)
+                yield name, '-', result(n, *measure(lambda: front_end(name, path), repeat, memory))
+            continue
+        for engine in engines:
+            if allowed is None or engine in allowed:
+                yield name, engine, result(n, *measure(lambda: run_script(src, engine), repeat, memory))
+
+def result(n, secs, peak):
+    return {'n': n, 'tempo_s': secs, 'ops_s': n / secs, 'pico_kb': None if peak is None else peak // 1024}
+
+def compare(r, base, tolerance):
+    # Devolve (texto, regrediu?) comparando ops/s com a linha de base
+    if not base or base.get('n') != r['n']:
+        return '', False
+    ratio = r['ops_s'] / base['ops_s'] - 1
+    return f"{ratio:+.1%}" + (' !' if ratio < -tolerance else ''), ratio < -tolerance
+
+def main():
+    ap = argparse.ArgumentParser(prog='bench.py', description='Benchmarks do interpretador MiniLang.')
+    ap.add_argument('-w', '--workload', choices=WORKLOADS, action='append', help='carga a medir (padrão: todas)')
+    ap.add_argument('--engine', choices=ENGINES, action='append', help='modo de execução (padrão: todos)')
+    ap.add_argument('--scale', type=float, default=1.0, help='multiplica o tamanho padrão de cada carga')
+    ap.add_argument('--repeat', type=int, default=3, help='execuções por medida (vale a mais rápida)')
+    ap.add_argument('--no-mem', action='store_true', help='não mede o pico de memória (tracemalloc)')
+    ap.add_argument('--baseline', metavar='ARQ', help='compara com uma linha de base salva com --save-baseline')
+    ap.add_argument('--save-baseline', metavar='ARQ', help='grava os resultados em JSON em ARQ')
+    ap.add_argument('--tolerance', type=float, default=0.10, help='queda de ops/s tolerada antes de acusar regressão (padrão: 0.10)')
+    ap.add_argument('--chamadas', action='store_true', help='só mede o custo de uma chamada de função (ns/chamada)')
+    ap.add_argument('-n', type=int, default=100000, help='chamadas por execução em --chamadas')
+    args = ap.parse_args()
+
+    engines = args.engine or ENGINES
+    if args.chamadas:
+        print(f"{'modo':<10}{'ns/chamada':>12}")
+        for engine in engines:
+            print(f"{engine:<10}{per_call(engine, args.n, args.repeat):>12.0f}")
+        return
+
+    base = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f: base = json.load(f)
+    print(f"{'carga':<20}{'modo':<9}{'n':>9}{'tempo(s)':>11}{'ops/s':>13}{'pico(KB)':>11}  vs base")
+    results, regressions = {}, 0
+    for name, engine, r in suite(args.workload or WORKLOADS, engines, args.scale, args.repeat, not args.no_mem):
+        results.setdefault(name, {})[engine] = r
+        diff, bad = compare(r, base.get(name, {}).get(engine), args.tolerance)
+        regressions += bad
+        peak = '-' if r['pico_kb'] is None else r['pico_kb']
+        print(f"{name:<20}{engine:<9}{r['n']:>9}{r['tempo_s']:>11.3f}{r['ops_s']:>13.0f}{peak:>11}  {diff}", flush=True)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"{regressions} medida(s) abaixo da linha de base (tolerância {args.tolerance:.0%})", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
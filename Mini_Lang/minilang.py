@@ -6,10 +6,28 @@ minilang.py — Minilang (Final)
 
 import sys
 import re
+import os
+import argparse
 import ast
+import bisect
+import codecs
+import collections
+import contextlib
+import gc
+import hashlib
+import itertools
+import json
+import marshal
 import operator
+import tempfile
+import threading
+import time
+import types
+from array import array
 
 sys.setrecursionlimit(2000)
+# Inteiros da MiniLang não têm limite de tamanho, inclusive ao imprimir
+if hasattr(sys, 'set_int_max_str_digits'): sys.set_int_max_str_digits(0)
 
 # ——————— LEXER —————————————————————————————————————————————
 class Token:
@@ -19,12 +37,44 @@ class Token:
     def __repr__(self):
         return f"{self.type}({self.val!r})@{self.line}:{self.col}"
 
+class LineIndex:
+    """Início (offset absoluto) de cada linha do código, para traduzir a posição
+    de um token em linha:coluna só quando alguém precisa dela."""
+    __slots__ = ('starts',)
+    def __init__(self):
+        self.starts = array('q', [0])
+
+    def add(self, chunk, base):
+        # Cada '\n' do bloco abre uma linha; tudo feito em C (split, map, accumulate)
+        parts = chunk.split('\n')
+        ends = itertools.accumulate(map(operator.add, map(len, parts[:-1]), itertools.repeat(1)), initial=base)
+        next(ends)
+        self.starts.extend(ends)
+
+    def line_col(self, pos):
+        i = bisect.bisect_right(self.starts, pos)
+        return i, pos - self.starts[i - 1] + 1
+
+class ScanToken(tuple):
+    """Token do Lexer: (tipo, valor, offset, LineIndex). É uma tupla para ser
+    criado sem passar por __init__; linha e coluna saem do LineIndex."""
+    __slots__ = ()
+    type = property(operator.itemgetter(0))
+    val = property(operator.itemgetter(1))
+    pos = property(operator.itemgetter(2))
+    @property
+    def line(self): return self[3].line_col(self[2])[0]
+    @property
+    def col(self): return self[3].line_col(self[2])[1]
+    def __repr__(self):
+        return f"{self.type}({self.val!r})@{self.line}:{self.col}"
+
 class Lexer:
+    # Usada por linha na análise incremental (IncrementalParser.lex_line)
     token_spec = [
         ('OP',       r'\*\*=|\+=|-=|\*=|/=|%=|==|!=|<=|>=|\*\*|&&|\|\||[+\-*/%<>=!()\[\]{},:]'),
         ('NUMBER',   r'\d+(\.\d+)?'),
-        ('STRING',   r'"([^"\\]|\\.)*"'),
-        ('BOOLEAN',  r'\b(true|false)\b'),
+        ('STRING',   r'"([^"\\\n]|\\.)*"'),
         ('ID',       r'[A-Za-z_]\w*'),
         ('NEWLINE',  r'\n'),
         ('SKIP',     r'[ \t]+'),
@@ -32,40 +82,84 @@ class Lexer:
         ('MISMATCH', r'.'),
     ]
     tok_re = re.compile('|'.join(f'(?P<{n}>{p})' for n, p in token_spec))
+    # tokenize: espaços, quebras de linha e comentários são consumidos pela
+    # própria regex, junto com o token seguinte, então cada casamento é um token
+    # (ou END, o que sobra depois do último). O comentário vai até o fim da
+    # linha e MISMATCH não casa espaço, então não há retrocesso para dentro deles.
+    scan_re = re.compile(r'(?:[ \t\n]+|#[^\n]*(?![^\n]))*(?:' + '|'.join(
+        f'(?P<{n}>{p})' for n, p in token_spec[:4]) + r'|(?P<MISMATCH>[^ \t\n])|(?P<END>\Z))')
+    # Palavras reservadas viram tokens próprios (o tipo é a palavra), para o
+    # Parser despachar por dicionário; and/or/not são operadores
+    KEYWORDS = ('func', 'if', 'else', 'end', 'while', 'for', 'in', 'return', 'break', 'continue')
+    WORDS = {'true': ('BOOLEAN', True), 'false': ('BOOLEAN', False),
+             'and': ('OP', 'and'), 'or': ('OP', 'or'), 'not': ('OP', 'not'), **{k: (k, k) for k in KEYWORDS}}
+    OPS = {op: sys.intern(op) for op in ('**=', '+=', '-=', '*=', '/=', '%=', '==', '!=', '<=', '>=', '**', '&&', '||',
+                                         *'+-*/%<>=!()[]{},:')}
+    CHUNK_SIZE = 1 << 16
 
     def __init__(self, code):
-        self.code = code
+        self.code = code    # string ou arquivo aberto em modo texto
+        self.index = LineIndex()
+
+    def chunks(self):
+        # Arquivos são lidos em blocos e cortados na última quebra de linha:
+        # como nenhum token atravessa linhas, cada pedaço tokeniza sozinho e o
+        # buffer nunca passa de um bloco mais uma linha incompleta.
+        if isinstance(self.code, str):
+            yield self.code
+            return
+        rest = ''
+        while True:
+            data = self.code.read(self.CHUNK_SIZE)
+            if not data: break
+            data = rest + data
+            cut = data.rfind('\n') + 1
+            if cut: yield data[:cut]
+            rest = data[cut:]
+        if rest: yield rest
+
+    @staticmethod
+    def token(kind, txt):
+        """(tipo, valor) do texto casado pelo grupo kind de token_spec."""
+        if kind == 'ID': return Lexer.WORDS.get(txt) or ('ID', sys.intern(txt))
+        if kind == 'OP': return 'OP', Lexer.OPS[txt]
+        if kind == 'NUMBER': return 'NUMBER', float(txt) if '.' in txt else int(txt)
+        if kind == 'STRING': return 'STRING', ast.literal_eval(txt)
+        return kind, txt
+
+    @staticmethod
+    def error(txt, line, col):
+        if txt == '"':
+            return SyntaxError(f"String não terminada na linha {line}:{col}")
+        return SyntaxError(f"Token inesperado {txt!r} na linha {line}:{col}")
 
     def tokenize(self):
-        line, col = 1, 1
-        for mo in self.tok_re.finditer(self.code):
-            kind, txt = mo.lastgroup, mo.group()
-            if kind == 'NEWLINE':
-                line += 1
-                col = 1
-                continue
-            if kind in ('SKIP', 'COMMENT'):
-                col += len(txt)
-                continue
-            if kind == 'MISMATCH':
-                raise SyntaxError(f"Token inesperado {txt!r} na linha {line}:{col}")
-            
-            val = txt
-            if kind == 'NUMBER':
-                val = float(txt) if '.' in txt else int(txt)
-            elif kind == 'STRING':
-                val = ast.literal_eval(txt)
-            elif kind == 'BOOLEAN':
-                val = (txt == 'true')
-
-            tok = Token(kind, val, line, col)
-            yield tok
-            col += len(txt)
-        yield Token('EOF', None, line, col)
+        index, base = self.index, 0
+        words, ops, intern = self.WORDS, self.OPS, sys.intern
+        for chunk in self.chunks():
+            index.add(chunk, base)
+            for mo in self.scan_re.finditer(chunk):
+                kind = mo.lastgroup
+                txt = mo.group(kind)
+                if kind == 'ID':
+                    typ, val = words.get(txt) or ('ID', intern(txt))
+                elif kind == 'OP':
+                    typ, val = 'OP', ops[txt]
+                elif kind == 'NUMBER':
+                    typ, val = 'NUMBER', float(txt) if '.' in txt else int(txt)
+                elif kind == 'STRING':
+                    typ, val = 'STRING', ast.literal_eval(txt) if '\\' in txt else txt[1:-1]
+                elif kind == 'END':
+                    break
+                else:
+                    raise self.error(txt, *index.line_col(base + mo.start(kind)))
+                yield ScanToken((typ, val, base + mo.start(kind), index))
+            base += len(chunk)
+        yield ScanToken(('EOF', None, base, index))
 
 # ——————— AST NODES ———————————————————————————————————————————
 class Node:
-    pass
+    tok = None  # Token onde a instrução começa (linha/coluna); só em instruções
 
 class Array(Node):
     __slots__ = ('elements',)
@@ -124,9 +218,15 @@ class If(Node):
 
 class While(Node):
     __slots__ = ('cond', 'body')
+    counted = None  # counted_loop já calculado pelo --tree (False: não é contado)
     def __init__(self, cond, body):
         self.cond, self.body = cond, body
 
+class For(Node):
+    __slots__ = ('var', 'iter', 'body')
+    def __init__(self, var, iter, body):
+        self.var, self.iter, self.body = var, iter, body
+
 class FuncDef(Node):
     __slots__ = ('name', 'params', 'body')
     def __init__(self, name, params, body):
@@ -141,11 +241,49 @@ class Return(Node):
     __slots__ = ('expr',)
     def __init__(self, expr):
         self.expr = expr
+
+class Break(Node):
+    __slots__ = ()
+
+class Continue(Node):
+    __slots__ = ()
+
+NO_CHILDREN = ()
+CHILDREN = {
+    Number: lambda n: NO_CHILDREN, String: lambda n: NO_CHILDREN, Boolean: lambda n: NO_CHILDREN,
+    Var: lambda n: NO_CHILDREN, Break: lambda n: NO_CHILDREN, Continue: lambda n: NO_CHILDREN,
+    Array: lambda n: n.elements,
+    Object: lambda n: [v for _, v in n.kv],
+    BinOp: lambda n: (n.l, n.r),
+    UnaryOp: lambda n: (n.e,),
+    Assign: lambda n: (n.var, n.expr),
+    Block: lambda n: n.stmts,
+    If: lambda n: (n.cond, n.then_block, n.else_block) if n.else_block else (n.cond, n.then_block),
+    While: lambda n: (n.cond, n.body),
+    For: lambda n: (n.iter, n.body),
+    FuncDef: lambda n: (n.body,),
+    FuncCall: lambda n: n.args,
+    Return: lambda n: (n.expr,),
+}
+
+def children(node):
+    """Filhos diretos de um nó (inclusive os valores de um Object)."""
+    return CHILDREN[type(node)](node)
+
+def walk(node):
+    """Todos os nós da subárvore, em pré-ordem."""
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        yield n
+        stack.extend(reversed(children(n)))
+
 # ——————— PARSER ——————————————————————————————————————————————
 class Parser:
     def __init__(self, toks):
         self.tokens = iter(toks)
         self.cur = None
+        self.loop_depth = 0
         self.next()
 
     def next(self):
@@ -166,15 +304,19 @@ class Parser:
         return Block(stmts)
 
     def stmt(self):
-        if self.cur.type == 'ID':
-            kw = self.cur.val
-            if kw == 'func': return self.parse_func()
-            if kw == 'if': return self.parse_if()
-            if kw == 'while': return self.parse_while()
-            if kw == 'return': return self.parse_return()
-        
+        tok = self.cur
+        node = self.statement()
+        node.tok = tok
+        return node
+
+    def statement(self):
+        parse = self.STATEMENTS.get(self.cur.type)
+        if parse: return parse(self)
+
         node = self.expr()
-        if isinstance(node, Var) and self.cur.type == 'OP' and self.cur.val in ('=', '+=', '-=', '*=', '/=', '%=', '**='):
+        # Alvo de atribuição: variável ou elemento (arr[i], obj["k"], m[i][j])
+        target = isinstance(node, Var) or isinstance(node, BinOp) and node.op == '[]'
+        if target and self.cur.type == 'OP' and self.cur.val in ('=', '+=', '-=', '*=', '/=', '%=', '**='):
             op = self.eat('OP')
             rhs = self.expr()
             return Assign(node, op, rhs)
@@ -186,12 +328,18 @@ class Parser:
 
     def parse_block(self, *end_keywords):
         stmts = []
-        while not (self.cur.type == 'ID' and self.cur.val in end_keywords) and self.cur.type != 'EOF':
+        while self.cur.type not in end_keywords and self.cur.type != 'EOF':
             stmts.append(self.stmt())
         return Block(stmts)
 
     def parse_func(self):
-        self.eat('ID', 'func'); name = self.eat('ID'); self.eat('OP', '(')
+        self.eat('func')
+        tok = self.cur
+        name = self.eat('ID')
+        if name in BUILTINS:
+            raise SyntaxError(f"Não é possível redefinir a função nativa '{name}' na linha {tok.line}:{tok.col}")
+        self.eat('OP', '(')
+        outer_loops, self.loop_depth = self.loop_depth, 0
         params = []
         if self.cur.val != ')':
             while True:
@@ -200,62 +348,99 @@ class Parser:
                 self.eat('OP', ',')
         self.eat('OP', ')')
         body = self.parse_block('end')
-        self.eat('ID', 'end'); self.eat('ID', 'func')
+        self.eat('end'); self.eat('func')
+        self.loop_depth = outer_loops
         return FuncDef(name, params, body)
 
     def parse_if(self):
-        self.eat('ID', 'if'); cond = self.expr()
+        self.eat('if'); cond = self.expr()
         then_block = self.parse_block('else', 'end')
         else_block = None
-        if self.cur.val == 'else':
+        if self.cur.type == 'else':
             self.next()
             else_block = self.parse_block('end')
-        self.eat('ID', 'end'); self.eat('ID', 'if')
+        self.eat('end'); self.eat('if')
         return If(cond, then_block, else_block)
 
     def parse_while(self):
-        self.eat('ID', 'while'); cond = self.expr()
+        self.eat('while'); cond = self.expr()
+        self.loop_depth += 1
         body = self.parse_block('end')
-        self.eat('ID', 'end'); self.eat('ID', 'while')
+        self.loop_depth -= 1
+        self.eat('end'); self.eat('while')
         return While(cond, body)
 
+    def parse_for(self):
+        self.eat('for'); var = self.eat('ID')
+        self.eat('in'); iterable = self.expr()
+        self.loop_depth += 1
+        body = self.parse_block('end')
+        self.loop_depth -= 1
+        self.eat('end'); self.eat('for')
+        return For(var, iterable, body)
+
     def parse_return(self):
-        self.eat('ID', 'return')
+        self.eat('return')
         return Return(self.expr())
-    
-    def expr(self): return self.logical()
-    def logical(self):
-        node = self.rel();
-        while (self.cur.type == 'OP' and self.cur.val in ('&&', '||')) or (self.cur.type == 'ID' and self.cur.val in ('and', 'or')):
-            op = self.eat(self.cur.type); node = BinOp(node, op, self.rel())
-        return node
-    def rel(self):
-        node = self.add();
-        while self.cur.type == 'OP' and self.cur.val in ('==', '!=', '<', '>', '<=', '>='):
-            op = self.eat('OP'); node = BinOp(node, op, self.add())
-        return node
-    def add(self):
-        node = self.mul();
-        while self.cur.type == 'OP' and self.cur.val in ('+', '-'):
-            op = self.eat('OP'); node = BinOp(node, op, self.mul())
-        return node
-    def mul(self):
-        node = self.pow();
-        while self.cur.type == 'OP' and self.cur.val in ('*', '/', '%'):
-            op = self.eat('OP'); node = BinOp(node, op, self.pow())
-        return node
-    def pow(self):
-        node = self.unary();
-        if self.cur.type == 'OP' and self.cur.val == '**':
-            op = self.eat('OP'); return BinOp(node, op, self.pow())
-        return node
-    def unary(self):
-        if (self.cur.type == 'OP' and self.cur.val in ('!', '-')) or (self.cur.type == 'ID' and self.cur.val == 'not'):
-            op = self.eat(self.cur.type); return UnaryOp(op, self.unary())
-        return self.primary()
-        
+
+    def parse_loop_control(self):
+        kw = self.cur.type
+        if not self.loop_depth:
+            raise SyntaxError(f"'{kw}' fora de um laço na linha {self.cur.line}:{self.cur.col}")
+        self.next()
+        return Break() if kw == 'break' else Continue()
+
+    # Tipo do token (a própria palavra reservada) -> método que analisa a instrução
+    STATEMENTS = {'func': parse_func, 'if': parse_if, 'while': parse_while, 'for': parse_for,
+                  'return': parse_return, 'break': parse_loop_control, 'continue': parse_loop_control}
+
+    # ——— Expressões: Pratt (precedence climbing) ———
+    # Operador binário -> (força à esquerda, força do operando direito). Força
+    # direita maior que a esquerda associa à esquerda; igual, à direita ('**').
+    # Um operador novo é só uma entrada aqui (e a sua semântica em BINOPS).
+    BINARY = {op: (bp, bp + (op != '**')) for ops, bp in (
+        (('&&', '||', 'and', 'or'), 1),
+        (('==', '!=', '<', '>', '<=', '>='), 2),
+        (('+', '-'), 3),
+        (('*', '/', '%'), 4),
+        (('**',), 5)) for op in ops}
+    # Prefixos ligam mais forte que qualquer binário: -x ** 2 é (-x) ** 2
+    PREFIX, PREFIX_BP = frozenset(('!', '-', 'not')), 6
+
+    def expr(self, min_bp=0):
+        tok = self.cur
+        if tok.type == 'OP' and tok.val in self.PREFIX:
+            self.next(); node = UnaryOp(tok.val, self.expr(self.PREFIX_BP))
+        else:
+            node = self.primary()
+        binary = self.BINARY
+        while True:
+            tok = self.cur
+            if tok.type != 'OP': return node
+            bp = binary.get(tok.val)
+            if bp is None or bp[0] < min_bp: return node
+            self.next(); node = BinOp(node, tok.val, self.expr(bp[1]))
+
     def primary(self):
         t, v = self.cur.type, self.cur.val
+        if t == 'ID':
+            self.next(); node = Var(v)
+
+            if self.cur.type == 'OP' and self.cur.val == '(':
+                self.next(); args = []
+                if self.cur.val != ')':
+                    while True:
+                        args.append(self.expr())
+                        if self.cur.val == ')': break
+                        self.eat('OP', ',')
+                self.eat('OP', ')'); return FuncCall(v, args)
+
+            while self.cur.type == 'OP' and self.cur.val == '[':
+                self.next(); idx_expr = self.expr(); self.eat('OP', ']')
+                node = BinOp(node, '[]', idx_expr)
+            
+            return node
+
         if t == 'NUMBER': self.next(); return Number(v)
         if t == 'STRING': self.next(); return String(v)
         if t == 'BOOLEAN': self.next(); return Boolean(v)
@@ -277,8 +462,10 @@ class Parser:
             self.next(); kv = []
             if self.cur.val != '}':
                 while True:
-                    if self.cur.type in ('STRING', 'ID'):
-                        key = self.eat(self.cur.type)
+                    # Palavras reservadas também servem de chave: {end: 1}
+                    if self.cur.type in ('STRING', 'ID') or self.cur.val in Lexer.WORDS:
+                        key = self.cur.val
+                        self.next()
                     else:
                         raise SyntaxError(f"Esperada uma chave como STRING ou ID, mas encontrou {self.cur.type}")
                     self.eat('OP', ':'); valn = self.expr(); kv.append((key, valn))
@@ -286,41 +473,558 @@ class Parser:
                     self.eat('OP', ',')
             self.eat('OP', '}'); return Object(kv)
             
-        if t == 'ID':
-            name = self.eat('ID')
-            node = Var(name)
+        raise SyntaxError(f"Expressão inválida na linha {self.cur.line}:{self.cur.col}")
 
-            if self.cur.type == 'OP' and self.cur.val == '(':
-                self.next(); args = []
-                if self.cur.val != ')':
-                    while True:
-                        args.append(self.expr())
-                        if self.cur.val == ')': break
-                        self.eat('OP', ',')
-                self.eat('OP', ')'); return FuncCall(name, args)
+# ——————— ANÁLISE INCREMENTAL —————————————————————————————————
+# Para integração com editores: a cada edição só as linhas tocadas são
+# re-tokenizadas e só as instruções de topo afetadas são re-analisadas; os
+# demais Tokens e subárvores são reaproveitados. Como nenhum token atravessa
+# uma quebra de linha, cada linha é tokenizada isoladamente.
+class StartLines:
+    """Linhas de início de uma lista de pares [nó, token], como sequência para o
+    bisect (o argumento key= só existe a partir do Python 3.10)."""
+    __slots__ = ('stmts',)
+    def __init__(self, stmts): self.stmts = stmts
+    def __len__(self): return len(self.stmts)
+    def __getitem__(self, i): return self.stmts[i][1].line
 
-            while self.cur.type == 'OP' and self.cur.val == '[':
-                self.next(); idx_expr = self.expr(); self.eat('OP', ']')
-                node = BinOp(node, '[]', idx_expr)
-            
-            return node
+class IncrementalParser:
+    BOF = Token('BOF', None, 1, 1)
 
-        raise SyntaxError(f"Expressão inválida na linha {self.cur.line}:{self.cur.col}")
+    def __init__(self, code=''):
+        self.lines = code.split('\n')
+        self.toks = [self.lex_line(i) for i in range(len(self.lines))]
+        self.stmts = []     # pares [nó, primeiro token]; nó None = trecho com erro
+        self.error = None
+        try: self.reparse(0, [])
+        except SyntaxError: pass
+
+    @property
+    def text(self):
+        return '\n'.join(self.lines)
+
+    @property
+    def tree(self):
+        if self.error: raise self.error
+        return Block([node for node, _ in self.stmts])
+
+    def lex_line(self, i):
+        toks, col = [], 1
+        for mo in Lexer.tok_re.finditer(self.lines[i]):
+            kind, txt = mo.lastgroup, mo.group()
+            if kind not in ('SKIP', 'COMMENT'):
+                typ, val = Lexer.token(kind, txt)
+                toks.append(Token(typ, val, i + 1, col))
+            col += len(txt)
+        return toks
+
+    def tokens(self, li=0, ti=0):
+        toks = self.toks
+        for i in range(li, len(toks)):
+            for tok in (toks[i][ti:] if i == li else toks[i]):
+                if tok.type == 'MISMATCH':
+                    raise Lexer.error(tok.val, tok.line, tok.col)
+                yield tok
+        yield Token('EOF', None, len(self.lines), len(self.lines[-1]) + 1)
+
+    def edit(self, start_line, start_col, end_line, end_col, text):
+        """Substitui o trecho [início, fim) (linhas e colunas a partir de 1) por text."""
+        lines, stmts = self.lines, self.stmts
+        a, b = start_line - 1, end_line - 1
+        if not (0 <= a <= b < len(lines) and 1 <= start_col <= len(lines[a]) + 1
+                and 1 <= end_col <= len(lines[b]) + 1 and (a < b or start_col <= end_col)):
+            raise ValueError(f"Intervalo de edição inválido {start_line}:{start_col}-{end_line}:{end_col}")
+        # Em coordenadas antigas: uma instrução depende também do token que a
+        # segue, então é afetada se o início da próxima cai na região editada
+        starts = StartLines(stmts)
+        i = max(bisect.bisect_left(starts, a + 1, lo=1) - 1, 0)
+        j = bisect.bisect_right(starts, b + 1)
+        if self.error:
+            i, j = min(i, self.broken), max(j, self.broken + 1)
+        new = (lines[a][:start_col - 1] + text + lines[b][end_col - 1:]).split('\n')
+        delta = len(new) - (b - a + 1)
+        lines[a:b + 1] = new
+        self.toks[a:b + 1] = [self.lex_line(k) for k in range(a, a + len(new))]
+        if delta:
+            for k in range(a + len(new), len(lines)):
+                for tok in self.toks[k]: tok.line += delta
+        try: self.reparse(i, stmts[j:])
+        except SyntaxError: pass
+        return self.tree
+
+    def reparse(self, i, after):
+        start = self.stmts[i][1] if i else self.BOF
+        li = start.line - 1
+        new, k, p = [], 0, None
+        try:
+            p = Parser(self.tokens(li, self.toks[li].index(start)) if i else self.tokens())
+            while p.cur.type != 'EOF':
+                # Instruções antigas engolidas pela nova análise são descartadas;
+                # ao alcançar o início de uma intacta, o resto é reaproveitado
+                while k < len(after) and (after[k][1].line, after[k][1].col) < (p.cur.line, p.cur.col):
+                    k += 1
+                if k < len(after) and after[k][1] is p.cur: break
+                first = p.cur
+                new.append([p.stmt(), first])
+            else:
+                k = len(after)  # chegou ao fim: as antigas que sobraram foram engolidas
+        except SyntaxError as e:
+            self.error, self.broken = e, i
+            if p is not None:
+                # Descarta também as engolidas pela instrução que falhou
+                while k < len(after) and (after[k][1].line, after[k][1].col) < (p.cur.line, p.cur.col):
+                    k += 1
+                if p.cur.type == 'EOF': k = len(after)
+            self.stmts = self.stmts[:i] + [[None, start]] + after[k:]
+            raise
+        self.error = None
+        self.stmts = self.stmts[:i] + new + after[k:]
+
+# ——————— ENTRADA E SAÍDA —————————————————————————————————————
+# print, input e flush escrevem e leem pelos destinos da thread corrente
+# (STDIO.out e STDIO.inp, ver run e Interpreter); sem destino definido, usam
+# sys.stdout/sys.stdin. Na linha de comando a saída passa por um OutputBuffer
+# e a entrada por um InputReader, que trocam a escrita e a leitura linha a
+# linha por blocos grandes.
+STDIO = threading.local()
+
+def ml_print(*vals):
+    (getattr(STDIO, 'out', None) or sys.stdout).write(' '.join(map(str, vals)) + '\n')
+
+def ml_flush():
+    (getattr(STDIO, 'out', None) or sys.stdout).flush()
+
+def ml_input():
+    inp = getattr(STDIO, 'inp', None) or sys.stdin
+    # Num terminal, o que já foi impresso (um prompt) aparece antes da leitura
+    if inp.isatty(): ml_flush()
+    line = inp.readline()
+    if not line: raise RuntimeError("A função 'input' chegou ao fim da entrada.")
+    return line[:-1] if line.endswith('\n') else line
+
+class OutputBuffer:
+    """Junta as escritas e só as repassa ao stream ao passar de limit
+    caracteres (limit=0: a cada escrita, para terminais), em flush() ou no fim."""
+    __slots__ = ('stream', 'limit', 'parts', 'size')
+    def __init__(self, stream, limit=64 * 1024):
+        self.stream, self.limit = stream, limit
+        self.parts, self.size = [], 0
+
+    def write(self, s):
+        self.parts.append(s)
+        self.size += len(s)
+        if self.size >= self.limit: self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.stream.write(''.join(self.parts))
+            self.parts.clear(); self.size = 0
+        self.stream.flush()
+
+    def isatty(self): return self.stream.isatty()
+
+class InputReader:
+    """Lê a entrada em blocos de até size bytes, já separados em linhas, e
+    entrega uma por readline(). Usa read1 do buffer binário, que devolve o que
+    já chegou sem esperar o bloco inteiro, então também funciona num terminal.
+    Como o sys.stdin, só separa em '\n' e não traduz '\r'."""
+    __slots__ = ('stream', 'raw', 'size', 'decoder', 'lines', 'tail', 'eof', 'tty')
+    def __init__(self, stream, size=64 * 1024):
+        self.stream, self.size = stream, size
+        self.raw = getattr(stream, 'buffer', None)
+        enc = getattr(stream, 'encoding', None) or 'utf-8'
+        self.decoder = codecs.getincrementaldecoder(enc)(getattr(stream, 'errors', None) or 'strict')
+        self.lines, self.tail, self.eof = iter(()), '', False
+        self.tty = stream.isatty()
+
+    def isatty(self): return self.tty
+
+    def readline(self):
+        while True:
+            line = next(self.lines, None)
+            if line is not None: return line
+            if self.eof: return ''
+            self.fill()
+
+    def fill(self):
+        if self.raw is not None:
+            data = self.raw.read1(self.size)
+            text = self.decoder.decode(data, final=not data)
+        else:
+            text = data = self.stream.read(self.size)
+        lines = (self.tail + text).split('\n')
+        if data:
+            self.tail = lines.pop()
+        else:
+            # Fim da entrada: a última linha pode não ter '\n'
+            self.eof, self.tail = True, ''
+            last = lines.pop()
+            self.lines = itertools.chain(map(operator.add, lines, itertools.repeat('\n')), [last] if last else ())
+            return
+        self.lines = map(operator.add, lines, itertools.repeat('\n'))
+
+# ——————— FUNÇÕES NATIVAS & ARRAYS NUMÉRICOS —————————————————————
+# Arrays numéricos (numarray(...)) guardam os valores num array.array compacto
+# ('q' para inteiros, 'd' para floats) e aplicam + - * / % ** e comparações
+# elemento a elemento, contra outro array do mesmo tamanho ou contra um número,
+# num único passo em C (map sobre os buffers) em vez de um laço interpretado.
+# Comparações devolvem um BoolArray. Resultados que não cabem em 64 bits voltam
+# a ser uma lista comum, preservando os inteiros de tamanho arbitrário.
+class NumArray(array):
+    __slots__ = ()
+    def __repr__(self): return repr(list(self))
+    __str__ = __repr__
+    def __add__(self, o): return vector_op('+', self, o)
+    def __radd__(self, o): return vector_op('+', o, self)
+    def __sub__(self, o): return vector_op('-', self, o)
+    def __rsub__(self, o): return vector_op('-', o, self)
+    def __mul__(self, o): return vector_op('*', self, o)
+    def __rmul__(self, o): return vector_op('*', o, self)
+    def __mod__(self, o): return vector_op('%', self, o)
+    def __rmod__(self, o): return vector_op('%', o, self)
+    def __pow__(self, o): return vector_op('**', self, o)
+    def __rpow__(self, o): return vector_op('**', o, self)
+    def __eq__(self, o): return vector_op('==', self, o)
+    def __ne__(self, o): return vector_op('!=', self, o)
+    def __lt__(self, o): return vector_op('<', self, o)
+    def __le__(self, o): return vector_op('<=', self, o)
+    def __gt__(self, o): return vector_op('>', self, o)
+    def __ge__(self, o): return vector_op('>=', self, o)
+    def __neg__(self): return pack(map(operator.neg, self))
+    def __abs__(self): return pack(map(abs, self))
+    __hash__ = None
+
+class BoolArray(NumArray):
+    __slots__ = ()
+    def __getitem__(self, i): return bool(array.__getitem__(self, i))
+    def __iter__(self): return map(bool, array.__iter__(self))
+    def __bool__(self):
+        # Como no numpy: 'if a == b' seria verdadeiro para qualquer array não vazio
+        raise TypeError("Comparação entre arrays não tem valor lógico único: use sum(c) == len(c) (todos) ou sum(c) > 0 (algum).")
+
+COMPARISONS = ('==', '!=', '<', '>', '<=', '>=')
+
+def pack(vals, boolean=False):
+    vals = list(vals)
+    if boolean: return BoolArray('B', vals)
+    for code in 'qd':
+        try:
+            return NumArray(code, vals)
+        except TypeError:
+            continue
+        except OverflowError:
+            break
+    return vals
+
+def is_numeric(v):
+    return isinstance(v, NumArray) or type(v) in (int, float, bool)
+
+def is_float(v):
+    return type(v) is float or isinstance(v, NumArray) and v.typecode == 'd'
+
+def vector_op(op, l, r):
+    fn = BINOPS[op]
+    if is_numeric(l) and is_numeric(r):
+        # Só números dos dois lados: operadores nativos, sem os casos de string
+        if op == '+': fn = operator.add
+        elif op == '/': fn = operator.truediv if is_float(l) or is_float(r) else operator.floordiv
+    seq_l, seq_r = isinstance(l, (list, array)), isinstance(r, (list, array))
+    try:
+        if seq_l and seq_r:
+            if len(l) != len(r):
+                raise TypeError(f"Operação '{op}' entre arrays de tamanhos diferentes ({len(l)} e {len(r)}).")
+            vals = map(fn, l, r)
+        elif seq_l:
+            vals = map(fn, l, itertools.repeat(r))
+        else:
+            vals = map(fn, itertools.repeat(l), r)
+        return pack(vals, op in COMPARISONS)
+    except ZeroDivisionError:
+        raise ZeroDivisionError("Divisão por zero.")
+
+def b_numarray(values):
+    if not isinstance(values, (list, array)) or not all(type(v) in (int, float) for v in values):
+        raise TypeError("A função 'numarray' espera um array de números.")
+    arr = pack(values)
+    if type(arr) is list: raise TypeError("A função 'numarray' só aceita inteiros de até 64 bits.")
+    return arr
+
+def b_len(x):
+    if not isinstance(x, (list, array, str, dict)):
+        raise TypeError(f"A função 'len' não se aplica a {type(x).__name__}.")
+    return len(x)
+
+def b_sum(x):
+    try:
+        return sum(x)
+    except TypeError:
+        raise TypeError("A função 'sum' espera um array de números.")
+
+def reduction(name, fn):
+    def reduce(*args):
+        try:
+            return fn(args[0]) if len(args) == 1 else fn(args)
+        except ValueError:
+            raise RuntimeError(f"A função '{name}' recebeu um array vazio.")
+        except TypeError:
+            raise TypeError(f"A função '{name}' espera números ou um array de números.")
+    return reduce
+
+def b_push(arr, v):
+    if not isinstance(arr, (list, array)):
+        raise TypeError("A função 'push' espera um array.")
+    try:
+        arr.append(v)
+    except TypeError:
+        raise TypeError(f"Não é possível guardar {type(v).__name__} neste numarray.")
+    return arr
+
+def b_pop(arr):
+    if not isinstance(arr, (list, array)):
+        raise TypeError("A função 'pop' espera um array.")
+    if not arr: raise RuntimeError("A função 'pop' recebeu um array vazio.")
+    return arr.pop()
+
+def range_of(*args):
+    if not all(type(a) is int for a in args):
+        raise TypeError("A função 'range' espera números inteiros.")
+    if len(args) == 3 and args[2] == 0:
+        raise RuntimeError("A função 'range' não aceita passo zero.")
+    return range(*args)
+
+def b_range(*args): return list(range_of(*args))
+
+def b_keys(obj):
+    if not isinstance(obj, dict): raise TypeError("A função 'keys' espera um objeto.")
+    return list(obj)
+
+def b_join(arr, sep=''):
+    if not isinstance(arr, (list, array)) or not isinstance(sep, str):
+        raise TypeError("A função 'join' espera um array e um separador string.")
+    return sep.join(map(str, arr))
+
+def b_split(s, sep=None):
+    if not isinstance(s, str) or not isinstance(sep, (str, type(None))):
+        raise TypeError("A função 'split' espera strings.")
+    if sep == '': return list(s)
+    return s.split(sep)
+
+def b_substr(s, start, n=None):
+    if not isinstance(s, str) or type(start) is not int or not isinstance(n, (int, type(None))) or type(n) is bool:
+        raise TypeError("A função 'substr' espera uma string, o início e o tamanho inteiros.")
+    return s[start:] if n is None else s[start:start + max(n, 0)]
+
+def b_abs(x):
+    if not is_numeric(x): raise TypeError("A função 'abs' espera um número.")
+    return abs(x)
+
+def b_sort(arr):
+    # Devolve um array novo, sem alterar o original
+    if not isinstance(arr, (list, array)): raise TypeError("A função 'sort' espera um array.")
+    try:
+        vals = sorted(arr)
+    except TypeError:
+        raise TypeError("A função 'sort' só ordena arrays de números ou de strings.")
+    return type(arr)(arr.typecode, vals) if isinstance(arr, array) else vals
+
+def b_num(x):
+    if type(x) in (int, float): return x
+    if type(x) is bool: return int(x)
+    if isinstance(x, str):
+        for conv in (int, float):
+            try: return conv(x)
+            except ValueError: pass
+    raise RuntimeError(f"A função 'num' não conseguiu converter {x!r} em número.")
+
+# nome -> (função Python, (mín, máx) de argumentos com máx None se ilimitado, pura?)
+# print e input têm tratamento próprio em cada modo e estão aqui só para
+# reservar o nome. Funções nativas não podem ser redefinidas por 'func'.
+# push e pop alteram o array recebido e por isso não contam como puras.
+BUILTINS = {
+    'print':    (ml_print, (0, None), False),
+    'input':    (ml_input, (0, 0), False),
+    'flush':    (ml_flush, (0, 0), False),
+    'len':      (b_len, (1, 1), True),
+    'sum':      (b_sum, (1, 1), True),
+    'min':      (reduction('min', min), (1, None), True),
+    'max':      (reduction('max', max), (1, None), True),
+    'numarray': (b_numarray, (1, 1), True),
+    'push':     (b_push, (2, 2), False),
+    'pop':      (b_pop, (1, 1), False),
+    'range':    (b_range, (1, 3), True),
+    'keys':     (b_keys, (1, 1), True),
+    'join':     (b_join, (1, 2), True),
+    'split':    (b_split, (1, 2), True),
+    'substr':   (b_substr, (2, 3), True),
+    'abs':      (b_abs, (1, 1), True),
+    'sort':     (b_sort, (1, 1), True),
+    'str':      (str, (1, 1), True),
+    'num':      (b_num, (1, 1), True),
+}
+
+def builtin(name, nargs):
+    fn, (lo, hi), _ = BUILTINS[name]
+    if lo <= nargs and (hi is None or nargs <= hi): return fn
+    if lo == hi:
+        raise TypeError(f"Função '{name}' espera {lo} argumentos, mas recebeu {nargs}.")
+    if hi is None:
+        raise TypeError(f"Função '{name}' espera ao menos {lo} argumento(s), mas recebeu {nargs}.")
+    raise TypeError(f"Função '{name}' espera de {lo} a {hi} argumentos, mas recebeu {nargs}.")
+
+# for x in expr: arrays e strings são percorridos direto pelo iterador do
+# Python; objetos, pelas chaves (copiadas, para o corpo poder alterar o objeto).
+# Um range(...) no próprio for não chega a virar lista: todos os modos iteram
+# direto sobre o range do Python (range_loop).
+def iterate(v):
+    if isinstance(v, (list, array, str)): return v
+    if isinstance(v, dict): return list(v)
+    raise TypeError(f"Não é possível percorrer {type(v).__name__} com 'for'.")
+
+def range_loop(node):
+    """Argumentos do range(...) que um for pode percorrer sem criar a lista, ou None."""
+    if isinstance(node, FuncCall) and node.name == 'range':
+        lo, hi = BUILTINS['range'][1]
+        if lo <= len(node.args) <= hi: return node.args
+    return None
+
+# Laço contado: 'while i < n ... i += k end while', com n literal ou variável
+# que o corpo não altera, k inteiro positivo e o incremento como última
+# instrução do corpo, que não pode ter continue (pularia o incremento). Todos
+# os modos percorrem um Counter em vez de avaliar a condição e o incremento a
+# cada volta: a variável recebe o valor de cada volta e, ao sair sem break, o
+# valor que o último incremento deixaria nela.
+# comparação -> (incremento exigido, ajuste do limite para o range)
+COUNTED = {'<': ('+', 0), '<=': ('+', 1), '>': ('-', 0), '>=': ('-', -1)}
+
+def counted_loop(node):
+    """(variável, limite, comparação, incremento, passo, corpo sem o incremento)
+    de um While contado, ou None."""
+    cond, stmts = node.cond, node.body.stmts
+    if not (isinstance(cond, BinOp) and cond.op in COUNTED and isinstance(cond.l, Var) and stmts): return None
+    var, bound, inc = cond.l.name, cond.r, stmts[-1]
+    if not (isinstance(bound, Number) or isinstance(bound, Var) and bound.name != var): return None
+    if not (isinstance(inc, Assign) and isinstance(inc.var, Var) and inc.var.name == var): return None
+    aug, step = AUG_OPS.get(inc.op), inc.expr
+    if (inc.op == '=' and isinstance(step, BinOp) and step.op in ('+', '-')
+            and isinstance(step.l, Var) and step.l.name == var):
+        aug, step = step.op, step.r   # i = i + k
+    if aug != COUNTED[cond.op][0] or not (isinstance(step, Number) and type(step.v) is int and step.v > 0):
+        return None
+    rest = Block(stmts[:-1])
+    fixed = {var, bound.name} if isinstance(bound, Var) else {var}
+    stack = [(rest, False)]   # (nó, dentro de outro laço ou função?)
+    while stack:
+        n, inner = stack.pop()
+        if isinstance(n, Assign) and isinstance(n.var, Var) and n.var.name in fixed: return None
+        if isinstance(n, For) and n.var in fixed: return None
+        if isinstance(n, Continue) and not inner: return None
+        inner = inner or isinstance(n, (While, For, FuncDef))
+        stack.extend((c, inner) for c in children(n))
+    return var, bound, cond.op, aug, step.v, rest
+
+class Counter:
+    """Valores da variável de um laço contado: um range nativo quando ela e o
+    limite são inteiros na entrada; senão um gerador que repete a comparação e
+    o incremento da MiniLang a cada volta. exit é o valor na saída sem break."""
+    __slots__ = ('items', 'exit')
+    def __init__(self, i, n, cmp, aug, k):
+        if type(i) is int and type(n) is int:
+            step = k if aug == '+' else -k
+            self.items = range(i, n + COUNTED[cmp][1], step)
+            self.exit = i + len(self.items) * step
+        else:
+            self.items, self.exit = self.generic(i, n, BINOPS[cmp], BINOPS[aug], k), i
+
+    def __iter__(self): return iter(self.items)
+
+    def generic(self, i, n, cmp, aug, k):
+        while cmp(i, n):
+            yield i
+            i = aug(i, k)
+        self.exit = i
 
 # ——————— INTERPRETER ———————————————————————————————————————
 class Environment(dict):
+    __slots__ = ('parent', 'retval', 'funcs')  # funcs: só no --tiered (Hot.run)
     def __init__(self, parent=None):
         self.parent = parent
         super().__init__()
     def get(self, key):
-        if key in self: return self[key]
-        if self.parent: return self.parent.get(key)
+        # Iterativo: a cadeia de ambientes pode ser tão funda quanto a recursão
+        env = self
+        while env is not None:
+            if key in env: return env[key]
+            env = env.parent
         raise NameError(f"Variável '{key}' não definida.")
     def set(self, key, value): self[key] = value
 
+# Só usada para reportar um 'return' fora de função
 class ReturnValue(Exception):
     def __init__(self, value): self.value = value
 
+# Sinais de controle: instruções devolvem um deles (ou None) em vez de lançar
+# exceções. O valor de um return fica no próprio ambiente/frame da função.
+class Signal:
+    __slots__ = ('name',)
+    def __init__(self, name): self.name = name
+    def __repr__(self): return f"<{self.name}>"
+
+BREAK, CONTINUE, RETURN = Signal('break'), Signal('continue'), Signal('return')
+
+def can_signal(node):
+    """Se a subárvore contém return/break/continue (fora de funções aninhadas)."""
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        if isinstance(n, (Return, Break, Continue)): return True
+        if not isinstance(n, FuncDef): stack.extend(children(n))
+    return False
+
+# Semântica dos operadores, compartilhada por todos os modos de execução
+def op_add(l, r):
+    if isinstance(l, str) or isinstance(r, str): return str(l) + str(r)
+    return l + r
+
+def op_div(l, r):
+    if isinstance(l, NumArray) or isinstance(r, NumArray): return vector_op('/', l, r)
+    if r == 0: raise ZeroDivisionError("Divisão por zero.")
+    return operator.truediv(l, r) if isinstance(l, float) or isinstance(r, float) else operator.floordiv(l, r)
+
+def op_index(obj, idx):
+    try:
+        return obj[idx]
+    except (KeyError, IndexError):
+        raise RuntimeError(f"Erro de acesso: chave ou índice '{idx}' não encontrado.")
+
+# o[k] = v e o[k] op= v: objeto, índice e valor já avaliados, uma vez cada
+def op_store(obj, idx, val):
+    try:
+        obj[idx] = val
+    except IndexError:
+        raise RuntimeError(f"Erro de acesso: chave ou índice '{idx}' não encontrado.")
+
+def op_update(obj, idx, fn, val):
+    try:
+        obj[idx] = fn(obj[idx], val)
+    except (KeyError, IndexError):
+        raise RuntimeError(f"Erro de acesso: chave ou índice '{idx}' não encontrado.")
+
+BINOPS = {'+': op_add, '-': operator.sub, '*': operator.mul, '/': op_div, '%': operator.mod, '**': operator.pow,
+          '==': operator.eq, '!=': operator.ne, '<': operator.lt, '>': operator.gt, '<=': operator.le, '>=': operator.ge}
+AUG_OPS = {'+=': '+', '-=': '-', '*=': '*', '/=': '/', '%=': '%', '**=': '**'}
+
+# Versões de + e / sem verificação de tipo, para operações cujos operandos a
+# inferência de tipos provou (TypeInference.fast)
+def op_div_int(l, r):
+    if r == 0: raise ZeroDivisionError("Divisão por zero.")
+    return l // r
+
+def op_div_float(l, r):
+    if r == 0: raise ZeroDivisionError("Divisão por zero.")
+    return l / r
+
+FAST_OPS = {'+num': operator.add, '+str': operator.add, '/int': op_div_int, '/float': op_div_float}
+
 def try_convert(v):
     if isinstance(v, str):
         if v.isdigit(): return int(v)
@@ -339,12 +1043,7 @@ def eval_node(node, env, funcs):
     if nt == 'BinOp':
         # Acesso a propriedade/índice
         if node.op == '[]':
-            obj = eval_node(node.l, env, funcs)
-            idx = eval_node(node.r, env, funcs)
-            try:
-                return obj[idx]
-            except (KeyError, IndexError):
-                raise RuntimeError(f"Erro de acesso: chave ou índice '{idx}' não encontrado.")
+            return op_index(eval_node(node.l, env, funcs), eval_node(node.r, env, funcs))
         
         # Operadores lógicos com curto-circuito
         if node.op in ('&&', 'and'): return eval_node(node.l, env, funcs) and eval_node(node.r, env, funcs)
@@ -352,12 +1051,7 @@ def eval_node(node, env, funcs):
         
         # Outros operadores binários
         l, r = eval_node(node.l, env, funcs), eval_node(node.r, env, funcs)
-        if node.op == '+' and (isinstance(l, str) or isinstance(r, str)): return str(l) + str(r)
-        ops = {'+': operator.add, '-': operator.sub, '*': operator.mul, '%': operator.mod, '**': operator.pow, '==': operator.eq, '!=': operator.ne, '<': operator.lt, '>': operator.gt, '<=': operator.le, '>=': operator.ge}
-        if node.op == '/':
-            if r == 0: raise ZeroDivisionError("Divisão por zero.")
-            return operator.truediv(l, r) if isinstance(l, float) or isinstance(r, float) else operator.floordiv(l, r)
-        if node.op in ops: return ops[node.op](l, r)
+        if node.op in BINOPS: return BINOPS[node.op](l, r)
         raise RuntimeError(f"Operador binário desconhecido: '{node.op}'")
 
     if nt == 'UnaryOp':
@@ -372,33 +1066,62 @@ def eval_node(node, env, funcs):
             obj = eval_node(node.var.l, env, funcs)
             idx = eval_node(node.var.r, env, funcs)
             val = eval_node(node.expr, env, funcs)
-            obj[idx] = val
+            if node.op == '=': op_store(obj, idx, val)
+            else: op_update(obj, idx, BINOPS[AUG_OPS[node.op]], val)
             return None
 
-        # Atribuição a variável normal
+        # Atribuição a variável normal; o valor vem antes da leitura da variável
         name = node.var.name
         val = eval_node(node.expr, env, funcs)
         if node.op != '=':
-            base = env.get(name)
-            op_map = {'+=': '+', '-=': '-', '*=': '*', '/=': '/', '%=': '%', '**=': '**'}
-            val = eval_node(BinOp(Var(name), op_map[node.op], node.expr), env, funcs)
+            val = BINOPS[AUG_OPS[node.op]](env.get(name), val)
         env.set(name, val)
         return None
 
     if nt == 'Block':
         for s in node.stmts:
-            eval_node(s, env, funcs)
+            r = eval_node(s, env, funcs)
+            if r is BREAK or r is CONTINUE or r is RETURN: return r
         return None
 
     if nt == 'If':
-        if eval_node(node.cond, env, funcs): eval_node(node.then_block, env, funcs)
-        elif node.else_block: eval_node(node.else_block, env, funcs)
+        if eval_node(node.cond, env, funcs): return eval_node(node.then_block, env, funcs)
+        elif node.else_block: return eval_node(node.else_block, env, funcs)
         return None
 
     if nt == 'While':
-        while eval_node(node.cond, env, funcs): eval_node(node.body, env, funcs)
+        loop = node.counted
+        if loop is None: loop = node.counted = counted_loop(node) or False
+        if loop:
+            var, bound, cmp, aug, k, rest = loop
+            items = Counter(env.get(var), eval_node(bound, env, funcs), cmp, aug, k)
+            for v in items:
+                env.set(var, v)
+                r = eval_node(rest, env, funcs)
+                if r is BREAK: return None
+                if r is RETURN: return r
+            env.set(var, items.exit)
+            return None
+        while eval_node(node.cond, env, funcs):
+            r = eval_node(node.body, env, funcs)
+            if r is BREAK: break
+            if r is RETURN: return r
         return None
 
+    if nt == 'For':
+        args = range_loop(node.iter)
+        if args is not None: items = range_of(*[eval_node(a, env, funcs) for a in args])
+        else: items = iterate(eval_node(node.iter, env, funcs))
+        for v in items:
+            env.set(node.var, v)
+            r = eval_node(node.body, env, funcs)
+            if r is BREAK: break
+            if r is RETURN: return r
+        return None
+
+    if nt == 'Break': return BREAK
+    if nt == 'Continue': return CONTINUE
+
     if nt == 'FuncDef':
         funcs[node.name] = (node.params, node.body)
         return None
@@ -407,11 +1130,14 @@ def eval_node(node, env, funcs):
         name = node.name
         if name == 'input':
             if node.args: raise TypeError("A função 'input' não aceita argumentos.")
-            return try_convert(input())
+            return try_convert(ml_input())
         if name == 'print':
             vals = [eval_node(a, env, funcs) for a in node.args]
-            print(*vals)
+            ml_print(*vals)
             return None
+        if name in BUILTINS:
+            fn = builtin(name, len(node.args))
+            return fn(*[eval_node(a, env, funcs) for a in node.args])
         if name not in funcs:
             raise NameError(f"Função '{name}' não definida.")
         params, body = funcs[name]
@@ -420,40 +1146,2318 @@ def eval_node(node, env, funcs):
         call_env = Environment(parent=env)
         for p, a in zip(params, node.args):
             call_env.set(p, eval_node(a, env, funcs))
-        try:
-            eval_node(body, call_env, funcs)
-        except ReturnValue as ret:
-            return ret.value
+        if eval_node(body, call_env, funcs) is RETURN:
+            return call_env.retval
         return None
 
     if nt == 'Return':
-        raise ReturnValue(eval_node(node.expr, env, funcs))
+        env.retval = eval_node(node.expr, env, funcs)
+        return RETURN
+
+    if nt == 'Hot': return node.run(env, funcs)
 
     raise RuntimeError(f"Nó AST desconhecido: {nt}")
 
+# ——————— RESOLUÇÃO DE ESCOPO ——————————————————————————————————
+# Na MiniLang uma função enxerga as variáveis de quem a chamou (escopo
+# dinâmico) e toda atribuição grava no escopo corrente. O Resolver descobre,
+# antes da execução, quais nomes cada escopo pode definir e fixa um slot para
+# cada um; o compilador de closures roda sobre frames que são listas simples:
+#
+#     [frame_pai, escopo, frame_global, valor_de_retorno, slot0, slot1, ...]
+#
+# Slot ainda não atribuído vale UNSET e a leitura segue para o frame pai,
+# exatamente como Environment.get.
+UNSET = object()
+PARENT, SCOPE, GLOBALS, RETVAL, SLOT0 = range(5)
+LOCAL, GLOBAL = 0, -1
+
+class Scope:
+    __slots__ = ('name', 'layout', 'template')
+    def __init__(self, name, names):
+        self.name = name
+        self.layout = {n: SLOT0 + i for i, n in enumerate(names)}
+        self.template = [None, self, None, None] + [UNSET] * len(self.layout)
+
+class Resolver:
+    def __init__(self, tree):
+        self.scopes = {}
+        self.func_bound = set()
+        self.module = self.declare(tree, '<main>', ())
+
+    def declare(self, body, name, params):
+        names = dict.fromkeys(params)
+        stack = [body]
+        while stack:
+            n = stack.pop()
+            if isinstance(n, FuncDef):
+                self.scopes[n] = scope = self.declare(n.body, n.name, n.params)
+                self.func_bound.update(scope.layout)
+                continue
+            if isinstance(n, Assign) and isinstance(n.var, Var):
+                names[n.var.name] = None
+            elif isinstance(n, For):
+                names[n.var] = None
+            stack.extend(children(n))
+        return Scope(name, names)
+
+    def resolve(self, scope, name):
+        """Mapeia um nome para (profundidade, slot): LOCAL no próprio frame,
+        GLOBAL quando só o escopo global pode defini-lo, ou (None, None) quando
+        só a cadeia de chamadas em tempo de execução sabe onde ele está."""
+        slot = scope.layout.get(name)
+        if slot is not None: return LOCAL, slot
+        slot = self.module.layout.get(name)
+        if slot is not None and name not in self.func_bound: return GLOBAL, slot
+        return None, None
+
+def unassigned_reads(block, params):
+    """Nomes que o bloco pode ler antes de atribuir localmente (análise de
+    atribuição definida); em tempo de execução, essas leituras caem para o
+    ambiente de quem chamou."""
+    out = set()
+    def reads(node, a):
+        out.update(n.name for n in walk(node) if isinstance(n, Var) and n.name not in a)
+    def run(b, a):
+        for s in b.stmts:
+            if isinstance(s, Assign):
+                reads(s.expr, a)
+                if isinstance(s.var, Var):
+                    if s.op != '=' and s.var.name not in a: out.add(s.var.name)
+                    a.add(s.var.name)
+                else:
+                    reads(s.var, a)
+            elif isinstance(s, If):
+                reads(s.cond, a)
+                t = run(s.then_block, set(a))
+                e = run(s.else_block, set(a)) if s.else_block else a
+                a |= t & e
+            elif isinstance(s, While):
+                reads(s.cond, a); run(s.body, set(a))
+            elif isinstance(s, For):
+                reads(s.iter, a); run(s.body, a | {s.var})
+            elif not isinstance(s, FuncDef):
+                reads(s, a)
+        return a
+    run(block, set(params))
+    return out
+
+def frame_get(f, name):
+    while f is not None:
+        slot = f[SCOPE].layout.get(name)
+        if slot is not None and f[slot] is not UNSET: return f[slot]
+        f = f[PARENT]
+    raise NameError(f"Variável '{name}' não definida.")
+
+def module_frame(scope, values=None):
+    """Frame global de uma execução: os slots do módulo, seguidos da tabela de
+    funções. Valores injetados (Interpreter) ocupam o slot do nome ou, se o
+    programa nunca atribui o nome, um frame acima do global."""
+    g = scope.template.copy(); g[GLOBALS] = g
+    g.append({})
+    extra = {}
+    for name, v in (values or {}).items():
+        slot = scope.layout.get(name)
+        if slot is None: extra[name] = v
+        else: g[slot] = v
+    if extra:
+        host = Scope('<host>', extra)
+        h = host.template.copy(); h[GLOBALS] = h
+        for name, v in extra.items(): h[host.layout[name]] = v
+        g[PARENT] = h
+    return g
+
+def frame_globals(g):
+    out = frame_globals(g[PARENT]) if g[PARENT] is not None else {}
+    out.update((n, g[s]) for n, s in g[SCOPE].layout.items() if g[s] is not UNSET)
+    return out
+
+# ——————— INFERÊNCIA DE TIPOS ——————————————————————————————————
+# Análise de fluxo que calcula, em cada ponto do programa, os tipos que cada
+# variável do escopo pode ter. Toda atribuição grava no escopo corrente, então
+# nenhuma chamada muda as variáveis de quem chamou; um nome que o escopo ainda
+# não atribuiu em todos os caminhos vem da cadeia de chamadas e pode ter
+# qualquer tipo. Parâmetros recebem a união dos argumentos de todas as chamadas
+# e cada chamada a união dos returns da função, repetindo até um ponto fixo.
+# Onde os dois operandos de + ou / ficam provados, os modos compilados usam as
+# versões de FAST_OPS, sem as verificações de op_add e op_div.
+TYPE_NAMES = ('int', 'float', 'bool', 'str', 'array', 'object', 'numarray', 'nulo')
+ANY, NO_TYPES = frozenset(TYPE_NAMES), frozenset()
+INTS = frozenset(('int', 'bool'))
+NUMBERS = INTS | {'float'}
+LITERAL_TYPES = {int: frozenset(('int',)), float: frozenset(('float',)), bool: frozenset(('bool',)), str: frozenset(('str',)),
+                 type(None): frozenset(('nulo',))}
+STATEMENT_NODES = (Block, If, While, For, FuncDef)
+# Nativas cujo resultado tem tipo conhecido; as demais valem qualquer tipo
+BUILTIN_TYPES = {
+    'print': LITERAL_TYPES[type(None)], 'flush': LITERAL_TYPES[type(None)], 'input': frozenset(('int', 'float', 'str')),
+    'len': frozenset(('int',)), 'num': frozenset(('int', 'float')), 'str': frozenset(('str',)),
+    'join': frozenset(('str',)), 'substr': frozenset(('str',)), 'numarray': frozenset(('numarray',)),
+    'range': frozenset(('array',)), 'keys': frozenset(('array',)), 'split': frozenset(('array',)),
+}
+
+def arith_type(op, a, b):
+    """Tipos de a op b para os tipos base a e b; ANY quando não há como provar."""
+    if a in NUMBERS and b in NUMBERS:
+        if op == '**': return frozenset(('int', 'float')) if a in INTS and b in INTS else ANY
+        return LITERAL_TYPES[int] if a in INTS and b in INTS else LITERAL_TYPES[float]
+    if op == '+' and 'str' in (a, b): return LITERAL_TYPES[str]
+    if op == '*' and {a, b} in ({'str', 'int'}, {'str', 'bool'}): return LITERAL_TYPES[str]
+    return ANY
+
+def binop_type(op, lt, rt):
+    if op in ('&&', 'and', '||', 'or'): return lt | rt
+    if op in COMPARISONS: return frozenset(('bool', 'numarray')) if 'numarray' in lt | rt else frozenset(('bool',))
+    if op not in BINOPS: return ANY
+    out = NO_TYPES
+    for a in lt:
+        for b in rt:
+            t = arith_type(op, a, b)
+            if t is ANY: return ANY
+            out |= t
+    return out
+
+def fast_op(op, lt, rt):
+    """Chave de FAST_OPS para op com operandos dos tipos lt e rt, ou None."""
+    if op == '+':
+        if lt <= NUMBERS and rt <= NUMBERS: return '+num'
+        if lt <= {'str'} and rt <= {'str'}: return '+str'
+    elif op == '/' and lt <= NUMBERS and rt <= NUMBERS:
+        if lt <= INTS and rt <= INTS: return '/int'
+        if lt <= {'float'} or rt <= {'float'}: return '/float'
+    return None
+
+def join_states(*states):
+    # Só continua definido o que todos os caminhos definem; tipos se somam
+    states = [s for s in states if s is not None]
+    if not states: return None
+    out = dict(states[0])
+    for s in states[1:]:
+        out = {k: t | s[k] for k, t in out.items() if k in s}
+    return out
+
+def type_label(t):
+    if t == ANY: return '?'
+    return ' | '.join(n for n in TYPE_NAMES if n in t) or '-'
+
+class TypeInference:
+    def __init__(self, tree):
+        # FuncDef é instrução: basta descer pelos blocos, sem visitar as expressões
+        self.defs, stack = [], [tree]
+        while stack:
+            n = stack.pop()
+            if isinstance(n, FuncDef): self.defs.append(n)
+            stack.extend(reversed([c for c in children(n) if isinstance(c, STATEMENT_NODES)]))
+        self.by_name = {}
+        for fd in self.defs: self.by_name.setdefault(fd.name, []).append(fd)
+        self.params = {fd: (NO_TYPES,) * len(fd.params) for fd in self.defs}
+        self.returns = dict.fromkeys(self.defs, NO_TYPES)
+        while True:
+            before = dict(self.params), dict(self.returns)
+            self.sites = {}   # nó de + ou / (BinOp ou Assign composto) -> (tipos à esquerda, à direita)
+            self.vars = {}    # FuncDef (None: módulo) -> {nome: tipos atribuídos}
+            self.scope(tree, None, {})
+            for fd in self.defs: self.scope(fd.body, fd, dict(zip(fd.params, self.params[fd])))
+            if (self.params, self.returns) == before: break
+        self.fast = {}    # nó -> chave de FAST_OPS
+        for node, (lt, rt) in self.sites.items():
+            key = fast_op(node.op if isinstance(node, BinOp) else AUG_OPS[node.op], lt, rt)
+            if key: self.fast[node] = key
+
+    def scope(self, body, fd, state):
+        self.fd, self.loops = fd, []  # loops: (estados no break, estados no continue) de cada laço aberto
+        self.vars[fd] = {}
+        for name, t in state.items(): self.bind(name, t)
+        if self.block(body, state) is not None: self.returned(LITERAL_TYPES[type(None)])
+
+    def bind(self, name, t):
+        names = self.vars[self.fd]
+        names[name] = names.get(name, NO_TYPES) | t
+
+    def returned(self, t):
+        if self.fd is not None: self.returns[self.fd] |= t
+
+    def block(self, node, state):
+        for s in node.stmts:
+            if state is None: break  # resto do bloco inalcançável
+            state = self.stmt(s, state)
+        return state
+
+    def stmt(self, node, state):
+        """Estado depois da instrução (None se ela nunca termina normalmente)."""
+        if isinstance(node, Assign):
+            t = self.expr(node.expr, state)
+            if isinstance(node.var, Var):
+                name = node.var.name
+                if node.op != '=': t = self.binop(node, AUG_OPS[node.op], state.get(name, ANY), t)
+                state[name] = t
+                self.bind(name, t)
+            else:
+                self.expr(node.var, state)
+            return state
+        if isinstance(node, If):
+            self.expr(node.cond, state)
+            then = self.block(node.then_block, dict(state))
+            return join_states(then, self.block(node.else_block, dict(state)) if node.else_block else state)
+        if isinstance(node, While):
+            return self.loop(node.cond, None, None, node.body, state)
+        if isinstance(node, For):
+            items = self.expr(node.iter, state)
+            t = LITERAL_TYPES[int] if range_loop(node.iter) is not None else items if items == {'str'} else ANY
+            return self.loop(None, node.var, t, node.body, state)
+        if isinstance(node, Return):
+            self.returned(self.expr(node.expr, state))
+            return None
+        if isinstance(node, (Break, Continue)):
+            if self.loops: self.loops[-1][isinstance(node, Continue)].append(state)
+            else: self.returned(LITERAL_TYPES[type(None)])  # fora de laço encerra a função
+            return None
+        if isinstance(node, FuncCall): self.expr(node, state)
+        return state  # FuncDef: o corpo é analisado como escopo próprio
+
+    def loop(self, cond, var, var_type, body, state):
+        # Ponto fixo: a entrada do laço junta o estado anterior e o de cada volta
+        head = state
+        while True:
+            if cond is not None: self.expr(cond, head)
+            inner = dict(head)
+            if var is not None:
+                inner[var] = var_type
+                self.bind(var, var_type)
+            self.loops.append(([], []))
+            out = self.block(body, inner)
+            breaks, continues = self.loops.pop()
+            new = join_states(head, out, *continues)
+            if new == head: return join_states(head, *breaks)
+            head = new
+
+    def binop(self, node, op, lt, rt):
+        if op in ('+', '/'):
+            l0, r0 = self.sites.get(node, (NO_TYPES, NO_TYPES))
+            self.sites[node] = (l0 | lt, r0 | rt)
+        return binop_type(op, lt, rt)
+
+    def expr(self, node, state):
+        if isinstance(node, LITERALS): return LITERAL_TYPES.get(type(node.v), ANY)
+        if isinstance(node, Var): return state.get(node.name, ANY)
+        if isinstance(node, BinOp):
+            lt, rt = self.expr(node.l, state), self.expr(node.r, state)
+            return ANY if node.op == '[]' else self.binop(node, node.op, lt, rt)
+        if isinstance(node, UnaryOp):
+            t = self.expr(node.e, state)
+            if node.op != '-': return LITERAL_TYPES[bool]
+            if t <= NUMBERS: return frozenset('int' if a in INTS else 'float' for a in t)
+            return ANY
+        if isinstance(node, Array):
+            for e in node.elements:
+                if not isinstance(e, LITERALS): self.expr(e, state)  # literais grandes: sem chamada por elemento
+            return frozenset(('array',))
+        if isinstance(node, Object):
+            for _, v in node.kv:
+                if not isinstance(v, LITERALS): self.expr(v, state)
+            return frozenset(('object',))
+        if isinstance(node, FuncCall):
+            args = [self.expr(a, state) for a in node.args]
+            if node.name in BUILTINS: return BUILTIN_TYPES.get(node.name, ANY)
+            out = NO_TYPES
+            for fd in self.by_name.get(node.name, ()):
+                if len(fd.params) == len(args):
+                    self.params[fd] = tuple(p | a for p, a in zip(self.params[fd], args))
+                    out |= self.returns[fd]
+            return out
+        return ANY
+
+    def report(self):
+        out = ['tipos inferidos (? = qualquer tipo, - = nunca atribuída ou nunca chamada)']
+        for fd, names in self.vars.items():
+            if fd is None: out.append('<módulo>')
+            else: out.append(f"{fd.name}({', '.join(fd.params)})" + (f" (linha {fd.tok.line})" if fd.tok else ''))
+            for name, t in names.items():
+                out.append(f"    {name:<20} {type_label(t)}")
+            if fd is not None: out.append(f"    {'(retorno)':<20} {type_label(self.returns[fd])}")
+        out.append(f"+ e / sem verificação de tipo: {len(self.fast)} de {len(self.sites)}")
+        return '\n'.join(out)
+
+# ——————— COMPILADOR DE CLOSURES ————————————————————————————————
+# Converte a AST em closures Python aninhadas uma única vez: o tipo de cada nó,
+# cada operador e o slot de cada variável são resolvidos na compilação e a
+# execução vira só chamadas. A semântica é a mesma de eval_node, que continua
+# disponível com --tree.
+LITERALS = (Number, String, Boolean)
+
+class Compiler:
+    def __init__(self, profiler=None, sampler=None, memo=None):
+        self.memo = memo          # Memo: chamadas a funções puras usam o cache
+        self.profiler = profiler  # com None o código gerado não tem instrumentação
+        self.sampler = sampler    # rotula as closures com a linha para o Sampler
+        self.line = 0             # linha da instrução sendo compilada
+        self.types = None         # TypeInference: + e / provados dispensam verificação
+
+    def compile_module(self, tree):
+        self.resolver = Resolver(tree)
+        self.types = TypeInference(tree)
+        self.scope = self.resolver.module
+        self.pure = pure_functions(tree) if self.memo else ()
+        self.fslot = len(self.scope.template)  # tabela de funções no frame global
+        body = self.compile(tree)
+        if self.profiler: body = self.profiler.func('<módulo>', 0, body)
+        scope = self.scope
+        def program(g=None):
+            if g is None: g = module_frame(scope)
+            if body(g) is RETURN: raise ReturnValue(g[RETVAL])
+            return g
+        program.scope = scope
+        return program
+
+    def compile(self, node):
+        meth = getattr(self, 'c_' + type(node).__name__, None)
+        if meth is None:
+            raise RuntimeError(f"Nó AST desconhecido: {type(node).__name__}")
+        return meth(node)
+
+    def local_slot(self, node):
+        if isinstance(node, Var):
+            depth, slot = self.resolver.resolve(self.scope, node.name)
+            if depth == LOCAL: return slot
+        return None
+
+    def store_slot(self, name):
+        # Todo nome atribuído é local ao escopo, então sempre tem slot próprio
+        return self.scope.layout[name]
+
+    def binop_fn(self, node, op):
+        fast = self.types and self.types.fast.get(node)
+        return FAST_OPS[fast] if fast else BINOPS[op]
+
+    def reader(self, name):
+        depth, slot = self.resolver.resolve(self.scope, name)
+        if depth == LOCAL:
+            def local(f):
+                v = f[slot]
+                if v is UNSET: return frame_get(f[PARENT], name)
+                return v
+            return local
+        if depth == GLOBAL:
+            def global_(f):
+                v = f[GLOBALS][slot]
+                if v is UNSET: raise NameError(f"Variável '{name}' não definida.")
+                return v
+            return global_
+        return lambda f: frame_get(f[PARENT], name)
+
+    def c_Number(self, node):
+        v = node.v
+        return lambda f: v
+    c_String = c_Boolean = c_Number
+
+    def c_Var(self, node):
+        return self.reader(node.name)
+
+    def c_Object(self, node):
+        kv = [(k, self.compile(v)) for k, v in node.kv]
+        return lambda f: {k: v(f) for k, v in kv}
+
+    def c_Array(self, node):
+        elems = [self.compile(e) for e in node.elements]
+        return lambda f: [e(f) for e in elems]
+
+    def c_BinOp(self, node):
+        op = node.op
+        l, r = self.compile(node.l), self.compile(node.r)
+        if op in ('&&', 'and'): return lambda f: l(f) and r(f)
+        if op in ('||', 'or'): return lambda f: l(f) or r(f)
+        if op == '[]': fn = op_index
+        elif op in BINOPS: fn = self.binop_fn(node, op)
+        else: raise RuntimeError(f"Operador binário desconhecido: '{op}'")
+        # Operandos folha (variável local ou literal) são lidos direto do frame
+        ls, rs = self.local_slot(node.l), self.local_slot(node.r)
+        if ls is not None and (rs is not None or isinstance(node.r, LITERALS)):
+            a_name = node.l.name
+            if rs is not None:
+                b_name = node.r.name
+                def var_var(f):
+                    a = f[ls]
+                    if a is UNSET: a = frame_get(f[PARENT], a_name)
+                    b = f[rs]
+                    if b is UNSET: b = frame_get(f[PARENT], b_name)
+                    return fn(a, b)
+                return var_var
+            c = node.r.v
+            def var_const(f):
+                a = f[ls]
+                if a is UNSET: a = frame_get(f[PARENT], a_name)
+                return fn(a, c)
+            return var_const
+        if fn is operator.add:
+            if isinstance(node.r, LITERALS):
+                c = node.r.v
+                return lambda f: l(f) + c
+            return lambda f: l(f) + r(f)
+        if op == '+':
+            # Caminho mais quente dos laços: evita a chamada extra a op_add
+            def add(f):
+                a, b = l(f), r(f)
+                if isinstance(a, str) or isinstance(b, str): return str(a) + str(b)
+                return a + b
+            return add
+        if isinstance(node.r, LITERALS):
+            c = node.r.v
+            return lambda f: fn(l(f), c)
+        return lambda f: fn(l(f), r(f))
+
+    def c_UnaryOp(self, node):
+        e = self.compile(node.e)
+        if node.op in ('!', 'not'): return lambda f: not e(f)
+        if node.op == '-': return lambda f: -e(f)
+        raise RuntimeError(f"Operador unário desconhecido: '{node.op}'")
+
+    def c_Assign(self, node):
+        expr = self.compile(node.expr)
+        # Atribuição a propriedade de objeto (ex: person["age"] = 31)
+        if isinstance(node.var, BinOp) and node.var.op == '[]':
+            obj, idx = self.compile(node.var.l), self.compile(node.var.r)
+            if node.op == '=':
+                def assign_item(f):
+                    o, i = obj(f), idx(f)
+                    op_store(o, i, expr(f))
+                return assign_item
+            fn = BINOPS[AUG_OPS[node.op]]
+            def aug_item(f):
+                o, i = obj(f), idx(f)
+                op_update(o, i, fn, expr(f))
+            return aug_item
+
+        name, slot = node.var.name, self.store_slot(node.var.name)
+        if node.op == '=':
+            def assign(f): f[slot] = expr(f)
+            return assign
+        fn = self.binop_fn(node, AUG_OPS[node.op])
+        def aug_assign(f):
+            val = expr(f)
+            base = f[slot]
+            if base is UNSET: base = frame_get(f[PARENT], name)
+            f[slot] = fn(base, val)
+        return aug_assign
+
+    # Instruções devolvem None ou um Signal; só blocos que podem receber um
+    # sinal pagam pela verificação.
+    def c_Block(self, node):
+        stmts = tuple(self.statement(s) for s in node.stmts)
+        if len(stmts) == 1: return stmts[0]
+        if not can_signal(node):
+            def block(f):
+                for s in stmts: s(f)
+            return block
+        def block_signal(f):
+            for s in stmts:
+                r = s(f)
+                if r is not None: return r
+        return block_signal
+
+    def statement(self, node):
+        # Linha numa local: compilar if/while/for/func sobrescreve self.line
+        # com a das instruções aninhadas
+        line = node.tok.line if node.tok else self.line
+        self.line = line
+        if isinstance(node, FuncCall):
+            c = self.c_FuncCall(node, stmt=True)  # já rotulada por c_FuncCall
+        else:
+            c = self.compile(node)
+            if self.sampler and node.tok: c = self.sampler.label(c, SAMPLE_STMT, '', line)
+        if self.profiler and node.tok: c = self.profiler.line(line, c)
+        return c
+
+    def c_If(self, node):
+        cond, then_block = self.compile(node.cond), self.compile(node.then_block)
+        if not node.else_block:
+            def if_(f):
+                if cond(f): return then_block(f)
+            return if_
+        else_block = self.compile(node.else_block)
+        def if_else(f):
+            if cond(f): return then_block(f)
+            return else_block(f)
+        return if_else
+
+    def c_While(self, node):
+        # Com --profile o laço roda na forma geral, para a linha do incremento
+        # continuar sendo contada
+        loop = None if self.profiler else counted_loop(node)
+        if loop is not None: return self.counted(*loop)
+        cond, body = self.compile(node.cond), self.compile(node.body)
+        if not can_signal(node.body):
+            def while_(f):
+                while cond(f): body(f)
+            return while_
+        def while_signal(f):
+            while cond(f):
+                r = body(f)
+                if r is not None:
+                    if r is BREAK: break
+                    if r is RETURN: return r
+        return while_signal
+
+    def counted(self, var, bound, cmp, aug, k, rest):
+        slot, start, stop, body = self.store_slot(var), self.reader(var), self.compile(bound), self.compile(rest)
+        if not can_signal(rest):
+            def counted(f):
+                items = Counter(start(f), stop(f), cmp, aug, k)
+                for f[slot] in items: body(f)
+                f[slot] = items.exit
+            return counted
+        def counted_signal(f):
+            items = Counter(start(f), stop(f), cmp, aug, k)
+            for f[slot] in items:
+                r = body(f)
+                if r is not None:
+                    if r is BREAK: return None
+                    if r is RETURN: return r
+            f[slot] = items.exit
+        return counted_signal
+
+    def c_For(self, node):
+        slot, body = self.store_slot(node.var), self.compile(node.body)
+        args = range_loop(node.iter)
+        if args is not None:
+            args = tuple(self.compile(a) for a in args)
+            items = lambda f: range_of(*[a(f) for a in args])
+        else:
+            expr = self.compile(node.iter)
+            items = lambda f: iterate(expr(f))
+        if not can_signal(node.body):
+            def for_(f):
+                for f[slot] in items(f): body(f)
+            return for_
+        def for_signal(f):
+            for f[slot] in items(f):
+                r = body(f)
+                if r is not None:
+                    if r is BREAK: break
+                    if r is RETURN: return r
+        return for_signal
+
+    def c_Break(self, node): return lambda f: BREAK
+    def c_Continue(self, node): return lambda f: CONTINUE
+
+    def c_FuncDef(self, node):
+        name, fslot = node.name, self.fslot
+        outer, self.scope = self.scope, self.resolver.scopes[node]
+        body = self.compile(node.body)
+        if self.profiler: body = self.profiler.func(name, node.tok.line if node.tok else 0, body)
+        scope, self.scope = self.scope, outer
+        fn = (len(node.params), tuple(scope.layout[p] for p in node.params), scope.template, body)
+        def define(f): f[GLOBALS][fslot][name] = fn
+        return define
+
+    def c_FuncCall(self, node, stmt=False):
+        # stmt: chamada usada como instrução, o valor é descartado
+        line = self.line
+        call = self.call(node, stmt)
+        if self.sampler:
+            user = node.name not in BUILTINS
+            call = self.sampler.label(call, SAMPLE_CALL if user else SAMPLE_STMT, node.name, line)
+        return call
+
+    def call(self, node, stmt):
+        name = node.name
+        args = tuple(self.compile(a) for a in node.args)
+        if name == 'input':
+            def input_(f):
+                if args: raise TypeError("A função 'input' não aceita argumentos.")
+                v = try_convert(ml_input())
+                if not stmt: return v
+            return input_
+        if name == 'print':
+            def print_(f): ml_print(*[a(f) for a in args])
+            return print_
+        if name in BUILTINS:
+            try:
+                fn = builtin(name, len(args))
+            except TypeError as e:
+                err = e
+                def bad_arity(f): raise err
+                return bad_arity
+            if stmt:
+                # Instruções devolvem None ou um Signal: o valor (push devolve
+                # o array) não pode chegar ao bloco
+                def builtin_stmt(f): fn(*[a(f) for a in args])
+                return builtin_stmt
+            if len(args) == 1:
+                a0 = args[0]
+                return lambda f: fn(a0(f))
+            return lambda f: fn(*[a(f) for a in args])
+        return self.user_call(name, args, stmt)
+
+    def user_call(self, name, args, stmt):
+        fslot, nargs = self.fslot, len(args)
+        if name in self.pure: return self.memo_call(name, args, stmt)
+        def call(f):
+            g = f[GLOBALS]
+            fn = g[fslot].get(name)
+            if fn is None:
+                raise NameError(f"Função '{name}' não definida.")
+            nparams, pslots, template, body = fn
+            if nparams != nargs:
+                raise TypeError(f"Função '{name}' espera {nparams} argumentos, mas recebeu {nargs}.")
+            nf = template.copy()
+            nf[PARENT] = f; nf[GLOBALS] = g
+            for s, a in zip(pslots, args):
+                nf[s] = a(f)
+            body(nf)
+            if not stmt: return nf[RETVAL]
+        return call
+
+    def memo_call(self, name, args, stmt):
+        fslot, memo, nargs = self.fslot, self.memo, len(args)
+        def call(f):
+            g = f[GLOBALS]
+            fn = g[fslot].get(name)
+            if fn is None:
+                raise NameError(f"Função '{name}' não definida.")
+            nparams, pslots, template, body = fn
+            if nparams != nargs:
+                raise TypeError(f"Função '{name}' espera {nparams} argumentos, mas recebeu {nargs}.")
+            vals = [a(f) for a in args]
+            key = memo.key(name, vals)
+            if key is not None:
+                v = memo.get(key)
+                if v is not MISSING: return v
+            nf = template.copy()
+            nf[PARENT] = f; nf[GLOBALS] = g
+            for s, v in zip(pslots, vals):
+                nf[s] = v
+            body(nf)
+            if key is not None: memo.put(key, nf[RETVAL])
+            if not stmt: return nf[RETVAL]
+        return call
+
+    def c_Return(self, node):
+        expr = self.compile(node.expr)
+        def return_(f):
+            f[RETVAL] = expr(f)
+            return RETURN
+        return return_
+
+# ——————— EXECUÇÃO EM CAMADAS ——————————————————————————————————
+# Com --tiered o programa começa no eval_node, que não paga compilação nenhuma,
+# e cada função e cada while contam chamadas e voltas. Passado o limiar, aquele
+# trecho é compilado em closures e trocado ali mesmo. As closures do
+# TierCompiler rodam sobre os mesmos Environment do eval_node, então um laço
+# sobe de camada no meio da execução (as voltas seguintes continuam do estado
+# atual) e código frio e quente se chamam livremente. Scripts curtos nunca
+# chegam a compilar nada.
+TIER_THRESHOLD = 100
+
+class Hot(Node):
+    """Corpo de função (kind 'func') ou while (kind 'while') do modo em camadas.
+    Só existe em memória: Tiers.prepare o coloca na AST já carregada."""
+    __slots__ = ('node', 'kind', 'name', 'tiers', 'count', 'code')
+    def __init__(self, node, kind, name, tiers):
+        self.node, self.kind, self.name, self.tiers = node, kind, name, tiers
+        self.count, self.code = 0, None
+
+    def run(self, env, funcs):
+        code = self.code
+        if code is None:
+            if self.kind == 'while': return self.loop(env, funcs)
+            self.count += 1
+            if self.count < self.tiers.threshold: return eval_node(self.node, env, funcs)
+            code = self.promote()
+        env.funcs = funcs
+        return code(env)
+
+    def loop(self, env, funcs):
+        node = self.node
+        while eval_node(node.cond, env, funcs):
+            r = eval_node(node.body, env, funcs)
+            if r is BREAK: return None
+            if r is RETURN: return r
+            self.count += 1
+            if self.count >= self.tiers.threshold:
+                # O código compilado continua daqui, reavaliando a condição
+                env.funcs = funcs
+                return (self.code or self.promote())(env)
+        return None
+
+    def promote(self):
+        t0 = time.perf_counter()
+        self.code = TierCompiler().compile(self.node)
+        self.tiers.promoted(self, time.perf_counter() - t0)
+        return self.code
+
+CHILDREN[Hot] = lambda n: (n.node,)
+
+class TierCompiler(Compiler):
+    """Compilador de closures cujo frame é o próprio Environment do eval_node,
+    indexado pelo nome da variável."""
+    def local_slot(self, node): return None
+    def store_slot(self, name): return name
+
+    def reader(self, name):
+        def read(f):
+            if name in f: return f[name]
+            return f.get(name)
+        return read
+
+    def c_Assign(self, node):
+        if node.op == '=' or not isinstance(node.var, Var): return super().c_Assign(node)
+        name, expr, fn = node.var.name, self.compile(node.expr), BINOPS[AUG_OPS[node.op]]
+        def aug_assign(f):
+            val = expr(f)
+            f[name] = fn(f.get(name), val)
+        return aug_assign
+
+    def c_FuncDef(self, node):
+        # O corpo é um Hot: sobe de camada sozinho, pelas próprias chamadas
+        name, fn = node.name, (node.params, node.body)
+        def define(f): f.funcs[name] = fn
+        return define
+
+    def user_call(self, name, args, stmt):
+        nargs = len(args)
+        def call(f):
+            funcs = f.funcs
+            fn = funcs.get(name)
+            if fn is None:
+                raise NameError(f"Função '{name}' não definida.")
+            params, body = fn
+            if len(params) != nargs:
+                raise TypeError(f"Função '{name}' espera {len(params)} argumentos, mas recebeu {nargs}.")
+            env = Environment(f)
+            for p, a in zip(params, args):
+                env[p] = a(f)
+            if body.run(env, funcs) is RETURN and not stmt: return env.retval
+        return call
+
+    def c_Return(self, node):
+        expr = self.compile(node.expr)
+        def return_(f):
+            f.retval = expr(f)
+            return RETURN
+        return return_
+
+    def c_Hot(self, node):
+        # while aninhado no trecho quente: é compilado junto
+        return self.compile(node.node)
+
+class Tiers:
+    """Limiar do --tiered e registro das trocas de camada (com trace, uma
+    linha em stderr a cada uma)."""
+    def __init__(self, threshold=TIER_THRESHOLD, trace=False):
+        self.threshold, self.trace = threshold, trace
+
+    def prepare(self, tree):
+        """Envolve em um Hot o corpo de cada função e cada while da AST."""
+        for n in list(walk(tree)):
+            if isinstance(n, FuncDef):
+                n.body = self.hot(n.body, 'func', n.name, n.tok)
+            elif isinstance(n, Block):
+                n.stmts = [self.hot(s, 'while', 'while', s.tok) if isinstance(s, While) else s for s in n.stmts]
+        return tree
+
+    def hot(self, node, kind, name, tok):
+        h = Hot(node, kind, name, self)
+        h.tok = tok
+        return h
+
+    def promoted(self, hot, secs):
+        if not self.trace: return
+        what = f"função '{hot.name}'" if hot.kind == 'func' else 'while'
+        where = f" (linha {hot.tok.line})" if hot.tok else ''
+        unit = 'chamadas' if hot.kind == 'func' else 'voltas'
+        print(f"camada: {what}{where} passou a closures após {hot.count} {unit} (compilação: {secs * 1000:.2f} ms)", file=sys.stderr)
+
+# ——————— BYTECODE & VM ————————————————————————————————————————
+# Segundo backend (--vm): a AST vira bytecode compacto, com opcodes e operandos
+# em buffers array, pool de constantes e saltos para posições absolutas, e roda
+# num único laço de despacho. Cada instrução tem exatamente um operando.
+# Chamadas não usam a pilha do Python: a VM guarda os frames numa lista, então
+# a profundidade de recursão só é limitada pela memória, e `return f(...)`
+# dentro de uma função vira TAIL_CALL, que reaproveita o frame corrente.
+(OP_LOAD, OP_CONST, OP_STORE, OP_BINOP, OP_JUMP_IF_FALSE, OP_JUMP, OP_INDEX, OP_LOAD_FUNC, OP_CALL,
+ OP_RETURN, OP_POP, OP_SWAP, OP_STORE_ITEM, OP_NOT, OP_NEG, OP_JUMP_IF_FALSE_OR_POP, OP_JUMP_IF_TRUE_OR_POP,
+ OP_BUILD_LIST, OP_BUILD_OBJ, OP_PRINT, OP_INPUT, OP_DEF, OP_HALT, OP_TAIL_CALL, OP_BUILTIN, OP_GET_ITER,
+ OP_FOR_ITER, OP_COUNT, OP_COUNT_EXIT, OP_UPDATE_ITEM) = range(30)
+OPNAMES = ('LOAD', 'CONST', 'STORE', 'BINOP', 'JUMP_IF_FALSE', 'JUMP', 'INDEX', 'LOAD_FUNC', 'CALL',
+           'RETURN', 'POP', 'SWAP', 'STORE_ITEM', 'NOT', 'NEG', 'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP',
+           'BUILD_LIST', 'BUILD_OBJ', 'PRINT', 'INPUT', 'DEF', 'HALT', 'TAIL_CALL', 'BUILTIN', 'GET_ITER', 'FOR_ITER',
+           'COUNT', 'COUNT_EXIT', 'UPDATE_ITEM')
+BINOP_NAMES = tuple(BINOPS) + tuple(FAST_OPS)
+BYTECODE_MAGIC = 'MLBC7'
+
+class CodeObject:
+    __slots__ = ('name', 'params', 'is_func', 'isolated', 'ops', 'args', 'consts', 'names')
+    def __init__(self, name, params, is_func, ops=None, args=None, consts=None, names=None, isolated=False):
+        self.name, self.params, self.is_func = name, tuple(params), is_func
+        # isolated: nenhuma leitura dinâmica do programa alcança os nomes deste
+        # escopo, então TAIL_CALL pode descartar seu ambiente
+        self.isolated = isolated
+        self.ops = ops if ops is not None else array('B')
+        self.args = args if args is not None else array('i')
+        self.consts = consts if consts is not None else []
+        self.names = names if names is not None else []
+
+    def pack(self):
+        # Forma aceita por marshal: funções aninhadas viram dicts {'code': ...}
+        args = array('i', self.args)
+        if sys.byteorder == 'big': args.byteswap()
+        consts = [{'code': c.pack()} if isinstance(c, CodeObject) else c for c in self.consts]
+        return (self.name, self.params, self.is_func, self.ops.tobytes(), args.tobytes(), consts, self.names, self.isolated)
+
+    @classmethod
+    def unpack(cls, t):
+        name, params, is_func, ops, args, consts, names, isolated = t
+        a = array('i'); a.frombytes(args)
+        if sys.byteorder == 'big': a.byteswap()
+        consts = [cls.unpack(c['code']) if isinstance(c, dict) else c for c in consts]
+        return cls(name, params, is_func, array('B', ops), a, consts, list(names), isolated)
+
+    def dumps(self):
+        return marshal.dumps((BYTECODE_MAGIC, self.pack()))
+
+    @classmethod
+    def loads(cls, data):
+        magic, t = marshal.loads(data)
+        if magic != BYTECODE_MAGIC:
+            raise ValueError("Bytecode de versão incompatível.")
+        return cls.unpack(t)
+
+    def dis(self):
+        lines = [f"== {self.name}({', '.join(self.params)})"]
+        for pc, (op, arg) in enumerate(zip(self.ops, self.args)):
+            if op in (OP_CONST, OP_COUNT): extra = repr(self.consts[arg])
+            elif op in (OP_LOAD, OP_STORE): extra = self.names[arg]
+            elif op in (OP_BINOP, OP_UPDATE_ITEM): extra = BINOP_NAMES[arg]
+            else: extra = ''
+            lines.append(f"{pc:5} {OPNAMES[op]:<22}{arg:<6}{extra}")
+        for c in self.consts:
+            if isinstance(c, CodeObject): lines.append(c.dis())
+        return '\n'.join(lines)
+
+class BytecodeCompiler:
+    def __init__(self, name='<main>', params=(), is_func=False):
+        self.code = CodeObject(name, params, is_func)
+        self.const_idx, self.name_idx = {}, {}
+        self.isolated = set()
+        self.fast = {}   # TypeInference.fast
+        self.loops = []  # (início, saltos de break) de cada laço aberto
+
+    def const(self, v):
+        key = (type(v), v)  # 1, 1.0 e true são constantes distintas
+        if key not in self.const_idx:
+            self.const_idx[key] = len(self.code.consts)
+            self.code.consts.append(v)
+        return self.const_idx[key]
+
+    def name(self, n):
+        if n not in self.name_idx:
+            self.name_idx[n] = len(self.code.names)
+            self.code.names.append(n)
+        return self.name_idx[n]
+
+    def emit(self, op, arg=0):
+        self.code.ops.append(op); self.code.args.append(arg)
+        return len(self.code.ops) - 1
+
+    def patch(self, pos):
+        self.code.args[pos] = len(self.code.ops)
+
+    def compile_module(self, tree):
+        funcs = [n for n in walk(tree) if isinstance(n, FuncDef)]
+        scopes = Resolver(tree).scopes
+        dynamic = set()
+        for fd in funcs: dynamic |= unassigned_reads(fd.body, fd.params)
+        self.isolated = {fd for fd in funcs if not dynamic.intersection(scopes[fd].layout)}
+        self.fast = TypeInference(tree).fast
+        self.compile(tree); self.emit(OP_HALT)
+        return self.code
+
+    def compile(self, node):
+        meth = getattr(self, 'c_' + type(node).__name__, None)
+        if meth is None:
+            raise RuntimeError(f"Nó AST desconhecido: {type(node).__name__}")
+        meth(node)
+
+    def c_Number(self, node): self.emit(OP_CONST, self.const(node.v))
+    c_String = c_Boolean = c_Number
+
+    def c_Var(self, node): self.emit(OP_LOAD, self.name(node.name))
+
+    def c_Array(self, node):
+        for e in node.elements: self.compile(e)
+        self.emit(OP_BUILD_LIST, len(node.elements))
+
+    def c_Object(self, node):
+        for _, v in node.kv: self.compile(v)
+        self.emit(OP_BUILD_OBJ, self.const(tuple(k for k, _ in node.kv)))
+
+    def c_BinOp(self, node):
+        op = node.op
+        self.compile(node.l)
+        if op in ('&&', 'and', '||', 'or'):
+            j = self.emit(OP_JUMP_IF_FALSE_OR_POP if op in ('&&', 'and') else OP_JUMP_IF_TRUE_OR_POP)
+            self.compile(node.r); self.patch(j)
+            return
+        self.compile(node.r)
+        if op == '[]': self.emit(OP_INDEX)
+        elif op in BINOPS: self.emit(OP_BINOP, BINOP_NAMES.index(self.fast.get(node, op)))
+        else: raise RuntimeError(f"Operador binário desconhecido: '{op}'")
+
+    def c_UnaryOp(self, node):
+        self.compile(node.e)
+        if node.op in ('!', 'not'): self.emit(OP_NOT)
+        elif node.op == '-': self.emit(OP_NEG)
+        else: raise RuntimeError(f"Operador unário desconhecido: '{node.op}'")
+
+    def c_Assign(self, node):
+        if isinstance(node.var, BinOp) and node.var.op == '[]':
+            self.compile(node.var.l); self.compile(node.var.r); self.compile(node.expr)
+            if node.op == '=': self.emit(OP_STORE_ITEM)
+            else: self.emit(OP_UPDATE_ITEM, BINOP_NAMES.index(AUG_OPS[node.op]))
+            return
+        slot = self.name(node.var.name)
+        self.compile(node.expr)
+        if node.op != '=':
+            self.emit(OP_LOAD, slot); self.emit(OP_SWAP)
+            self.emit(OP_BINOP, BINOP_NAMES.index(self.fast.get(node, AUG_OPS[node.op])))
+        self.emit(OP_STORE, slot)
+
+    def c_Block(self, node):
+        for s in node.stmts:
+            self.compile(s)
+            if isinstance(s, FuncCall): self.emit(OP_POP)
+
+    def c_If(self, node):
+        self.compile(node.cond)
+        jf = self.emit(OP_JUMP_IF_FALSE)
+        self.compile(node.then_block)
+        if node.else_block:
+            j = self.emit(OP_JUMP); self.patch(jf)
+            self.compile(node.else_block); self.patch(j)
+        else:
+            self.patch(jf)
+
+    def c_While(self, node):
+        loop = counted_loop(node)
+        if loop is not None: return self.counted(*loop)
+        start = len(self.code.ops)
+        self.compile(node.cond)
+        jf = self.emit(OP_JUMP_IF_FALSE)
+        self.loops.append((start, []))
+        self.compile(node.body)
+        _, breaks = self.loops.pop()
+        self.emit(OP_JUMP, start); self.patch(jf)
+        for j in breaks: self.patch(j)
+
+    def counted(self, var, bound, cmp, aug, k, rest):
+        # Pilha durante o laço: [Counter, iterador]. Esgotado, COUNT_EXIT troca
+        # os dois pelo valor de saída; break salta para os dois POPs finais
+        slot = self.name(var)
+        self.emit(OP_LOAD, slot); self.compile(bound)
+        self.emit(OP_COUNT, self.const((cmp, aug, k)))
+        start = self.emit(OP_FOR_ITER)
+        self.emit(OP_STORE, slot)
+        self.loops.append((start, []))
+        self.compile(rest)
+        _, breaks = self.loops.pop()
+        self.emit(OP_JUMP, start); self.patch(start)
+        self.emit(OP_COUNT_EXIT); self.emit(OP_STORE, slot)
+        done = self.emit(OP_JUMP)
+        for j in breaks: self.patch(j)
+        self.emit(OP_POP); self.emit(OP_POP)
+        self.patch(done)
+
+    def c_For(self, node):
+        # O iterador fica na pilha durante o laço; FOR_ITER salta para o POP
+        # final quando ele se esgota, e break salta para o mesmo POP
+        args = range_loop(node.iter)
+        if args is not None:
+            for a in args: self.compile(a)
+            self.emit(OP_GET_ITER, len(args))
+        else:
+            self.compile(node.iter)
+            self.emit(OP_GET_ITER)
+        start = self.emit(OP_FOR_ITER)
+        self.emit(OP_STORE, self.name(node.var))
+        self.loops.append((start, []))
+        self.compile(node.body)
+        _, breaks = self.loops.pop()
+        self.emit(OP_JUMP, start); self.patch(start)
+        for j in breaks: self.patch(j)
+        self.emit(OP_POP)
+
+    def c_Break(self, node): self.loops[-1][1].append(self.emit(OP_JUMP))
+    def c_Continue(self, node): self.emit(OP_JUMP, self.loops[-1][0])
+
+    def c_FuncDef(self, node):
+        sub = BytecodeCompiler(node.name, node.params, is_func=True)
+        sub.isolated, sub.fast = self.isolated, self.fast
+        sub.code.isolated = node in self.isolated
+        sub.compile(node.body)
+        sub.emit(OP_CONST, sub.const(None)); sub.emit(OP_RETURN)
+        self.emit(OP_DEF, self.const(sub.code))
+
+    def c_FuncCall(self, node):
+        if node.name == 'input':
+            self.emit(OP_INPUT, len(node.args))
+            return
+        if node.name == 'print':
+            for a in node.args: self.compile(a)
+            self.emit(OP_PRINT, len(node.args))
+            return
+        if node.name in BUILTINS:
+            # Com o número errado de argumentos o erro vem antes de avaliá-los
+            try:
+                builtin(node.name, len(node.args))
+                for a in node.args: self.compile(a)
+            except TypeError:
+                pass
+            self.emit(OP_BUILTIN, self.const((node.name, len(node.args))))
+            return
+        # A função é resolvida (e a aridade conferida) antes dos argumentos, como em eval_node
+        self.emit(OP_LOAD_FUNC, self.const((node.name, len(node.args))))
+        for a in node.args: self.compile(a)
+        self.emit(OP_CALL, len(node.args))
+
+    def c_Return(self, node):
+        e = node.expr
+        if self.code.is_func and isinstance(e, FuncCall) and e.name not in BUILTINS:
+            self.emit(OP_LOAD_FUNC, self.const((e.name, len(e.args))))
+            for a in e.args: self.compile(a)
+            self.emit(OP_TAIL_CALL, len(e.args))
+            return
+        self.compile(e); self.emit(OP_RETURN)
+
+class VM:
+    binfns = tuple(BINOPS[o] if o in BINOPS else FAST_OPS[o] for o in BINOP_NAMES)
+
+    def __init__(self):
+        self.funcs = {}
+
+    def execute(self, code, env):
+        ops, args, consts, names = code.ops, code.args, code.consts, code.names
+        funcs, binfns = self.funcs, self.binfns
+        frames = []  # (code, pc, stack, env) de cada chamador
+        stack = []
+        push, pop = stack.append, stack.pop
+        pc = 0
+        while True:
+            op = ops[pc]; arg = args[pc]; pc += 1
+            if op == OP_LOAD:
+                name = names[arg]
+                try: push(env[name])
+                except KeyError: push(env.get(name))
+            elif op == OP_CONST:
+                push(consts[arg])
+            elif op == OP_STORE:
+                env[names[arg]] = pop()
+            elif op == OP_BINOP:
+                r = pop(); stack[-1] = binfns[arg](stack[-1], r)
+            elif op == OP_JUMP_IF_FALSE:
+                if not pop(): pc = arg
+            elif op == OP_JUMP:
+                pc = arg
+            elif op == OP_INDEX:
+                i = pop(); stack[-1] = op_index(stack[-1], i)
+            elif op == OP_LOAD_FUNC:
+                name, nargs = consts[arg]
+                fn = funcs.get(name)
+                if fn is None:
+                    raise NameError(f"Função '{name}' não definida.")
+                if len(fn.params) != nargs:
+                    raise TypeError(f"Função '{name}' espera {len(fn.params)} argumentos, mas recebeu {nargs}.")
+                push(fn)
+            elif op == OP_CALL or op == OP_TAIL_CALL:
+                # O ambiente de quem chama continua sendo o pai (escopo dinâmico)
+                call_env = Environment(parent=env)
+                if arg:
+                    vals = stack[-arg:]; del stack[-arg:]
+                    fn = pop()
+                    for p, v in zip(fn.params, vals): call_env[p] = v
+                else:
+                    fn = pop()
+                if op == OP_CALL:
+                    frames.append((code, pc, stack, env))
+                    stack = []
+                    push, pop = stack.append, stack.pop
+                else:
+                    stack.clear()  # iteradores de laços for abertos no frame descartado
+                    if code.isolated: call_env.parent = env.parent
+                code, env, pc = fn, call_env, 0
+                ops, args, consts, names = code.ops, code.args, code.consts, code.names
+            elif op == OP_RETURN:
+                if not code.is_func:
+                    raise ReturnValue(pop())
+                v = pop()
+                if not frames:
+                    return v
+                code, pc, stack, env = frames.pop()
+                ops, args, consts, names = code.ops, code.args, code.consts, code.names
+                push, pop = stack.append, stack.pop
+                push(v)
+            elif op == OP_POP:
+                pop()
+            elif op == OP_SWAP:
+                stack[-1], stack[-2] = stack[-2], stack[-1]
+            elif op == OP_STORE_ITEM:
+                v = pop(); i = pop(); op_store(pop(), i, v)
+            elif op == OP_UPDATE_ITEM:
+                v = pop(); i = pop(); op_update(pop(), i, binfns[arg], v)
+            elif op == OP_NOT:
+                stack[-1] = not stack[-1]
+            elif op == OP_NEG:
+                stack[-1] = -stack[-1]
+            elif op == OP_JUMP_IF_FALSE_OR_POP:
+                if stack[-1]: pop()
+                else: pc = arg
+            elif op == OP_JUMP_IF_TRUE_OR_POP:
+                if stack[-1]: pc = arg
+                else: pop()
+            elif op == OP_BUILD_LIST:
+                if arg:
+                    vals = stack[-arg:]; del stack[-arg:]
+                else:
+                    vals = []
+                push(vals)
+            elif op == OP_BUILD_OBJ:
+                keys = consts[arg]
+                if keys:
+                    vals = stack[-len(keys):]; del stack[-len(keys):]
+                else:
+                    vals = ()
+                push(dict(zip(keys, vals)))
+            elif op == OP_PRINT:
+                if arg:
+                    vals = stack[-arg:]; del stack[-arg:]
+                else:
+                    vals = ()
+                ml_print(*vals)
+                push(None)
+            elif op == OP_INPUT:
+                if arg: raise TypeError("A função 'input' não aceita argumentos.")
+                push(try_convert(ml_input()))
+            elif op == OP_BUILTIN:
+                name, n = consts[arg]
+                fn = builtin(name, n)
+                if n:
+                    vals = stack[-n:]; del stack[-n:]
+                else:
+                    vals = ()
+                push(fn(*vals))
+            elif op == OP_GET_ITER:
+                # arg > 0: range(...) com arg argumentos, sem criar a lista
+                if arg:
+                    vals = stack[-arg:]; del stack[-arg:]
+                    push(iter(range_of(*vals)))
+                else:
+                    stack[-1] = iter(iterate(stack[-1]))
+            elif op == OP_FOR_ITER:
+                v = next(stack[-1], UNSET)
+                if v is UNSET: pc = arg
+                else: push(v)
+            elif op == OP_COUNT:
+                n = pop()
+                stack[-1] = c = Counter(stack[-1], n, *consts[arg])
+                push(iter(c))
+            elif op == OP_COUNT_EXIT:
+                pop(); stack[-1] = stack[-1].exit
+            elif op == OP_DEF:
+                fn = consts[arg]
+                funcs[fn.name] = fn
+            elif op == OP_HALT:
+                return None
+            else:
+                raise RuntimeError(f"Opcode desconhecido: {op}")
+
+# ——————— TRANSPILADOR PARA PYTHON ——————————————————————————————
+# Terceiro backend (--py): o programa vira código-fonte Python, compilado com
+# compile() e executado de forma nativa. Cada FuncDef vira um def, cada While
+# um while. Nomes da MiniLang ganham prefixo (v_ para variáveis, f_ para
+# funções) para não colidirem com palavras-chave nem com builtins do Python.
+# Operadores cuja semântica difere da do Python (+, / e indexação) continuam
+# passando pelas mesmas funções dos outros modos.
+PY_BINOPS = {'-': '-', '*': '*', '%': '%', '**': '**', '==': '==', '!=': '!=',
+             '<': '<', '>': '>', '<=': '<=', '>=': '>=', '&&': 'and', 'and': 'and', '||': 'or', 'or': 'or'}
+PY_HELPERS = {'+': '_add', '/': '_div', '[]': '_index', '/int': '_idiv', '/float': '_fdiv'}
+PY_FILENAME = '<minilang>'
+
+def py_dyn(name):
+    # Leitura dinâmica: percorre os frames Python das funções geradas a
+    # partir de quem chamou a função corrente, como Environment.get.
+    fr = sys._getframe(2)
+    while fr is not None:
+        if fr.f_code.co_filename == PY_FILENAME:
+            v = fr.f_locals.get(name, UNSET)
+            if v is not UNSET: return v
+            if fr.f_code.co_name == '<module>': break
+        fr = fr.f_back
+    raise NameError(f"Variável '{name[2:]}' não definida.")
+
+def py_checked(fn, name, nargs):
+    n = fn.__code__.co_argcount
+    if n != nargs:
+        raise TypeError(f"Função '{name}' espera {n} argumentos, mas recebeu {nargs}.")
+    return fn
+
+def py_no_args():
+    raise TypeError("A função 'input' não aceita argumentos.")
+
+PY_RUNTIME = {'_add': op_add, '_div': op_div, '_idiv': op_div_int, '_fdiv': op_div_float, '_index': op_index,
+              '_conv': try_convert, '_dyn': py_dyn,
+              '_checked': py_checked, '_no_args': py_no_args, '_UNSET': UNSET, '_Return': ReturnValue,
+              '_iter': iterate, '_range': range_of, '_Counter': Counter,
+              '_store': op_store, '_update': op_update, '_ops': BINOPS,
+              '_builtin': builtin, **{'b_' + name: fn for name, (fn, _, _) in BUILTINS.items()}}
+
+class PyTranspiler:
+    def __init__(self, tree):
+        self.tree = tree
+        self.resolver = Resolver(tree)
+        self.fast = TypeInference(tree).fast
+        self.arities = {}
+        for n in walk(tree):
+            if isinstance(n, FuncDef): self.arities.setdefault(n.name, set()).add(len(n.params))
+        # Estado do escopo corrente: nomes com certeza já atribuídos (None no
+        # escopo global), locais que podem ser lidos antes da atribuição e
+        # funções definidas dentro da função corrente.
+        self.scope, self.assigned, self.maybe, self.nested = self.resolver.module, None, set(), set()
+
+    def transpile(self):
+        out = []
+        self.block(self.tree, 0, out)
+        return '\n'.join(out) + '\n'
+
+    def block(self, node, ind, out):
+        if not node.stmts:
+            out.append('    ' * ind + 'pass')
+        for s in node.stmts:
+            self.stmt(s, ind, out)
+
+    def stmt(self, node, ind, out):
+        pad = '    ' * ind
+        if isinstance(node, Assign):
+            self.assign(node, pad, out)
+        elif isinstance(node, If):
+            out.append(f"{pad}if {self.expr(node.cond)}:")
+            before = self.assigned
+            self.assigned = None if before is None else set(before)
+            self.block(node.then_block, ind + 1, out)
+            after_then, self.assigned = self.assigned, None if before is None else set(before)
+            if node.else_block:
+                out.append(f"{pad}else:")
+                self.block(node.else_block, ind + 1, out)
+            if before is not None:
+                self.assigned = after_then & self.assigned
+        elif isinstance(node, While):
+            loop = counted_loop(node)
+            if loop is not None:
+                # Laço contado: um for sobre o Counter, e o else (sem break) grava o valor de saída
+                var, bound, cmp, aug, k, rest = loop
+                out.append(f"{pad}_c{ind} = _Counter({self.read(var)}, {self.expr(bound)}, {cmp!r}, {aug!r}, {k})")
+                out.append(f"{pad}for v_{var} in _c{ind}:")
+                body = rest
+            else:
+                out.append(f"{pad}while {self.expr(node.cond)}:")
+                body = node.body
+            before = self.assigned
+            self.assigned = None if before is None else set(before)
+            if loop is not None and before is not None: self.assigned.add(loop[0])
+            self.block(body, ind + 1, out)
+            self.assigned = before
+            if loop is not None:
+                out.append(f"{pad}else:")
+                out.append(f"{pad}    v_{loop[0]} = _c{ind}.exit")
+        elif isinstance(node, For):
+            args = range_loop(node.iter)
+            if args is not None: items = f"_range({', '.join(self.expr(a) for a in args)})"
+            else: items = f"_iter({self.expr(node.iter)})"
+            out.append(f"{pad}for v_{node.var} in {items}:")
+            before = self.assigned
+            self.assigned = None if before is None else before | {node.var}
+            self.block(node.body, ind + 1, out)
+            self.assigned = before
+        elif isinstance(node, FuncDef):
+            self.funcdef(node, ind, out)
+        elif isinstance(node, FuncCall):
+            out.append(pad + self.expr(node))
+        elif isinstance(node, Break):
+            out.append(pad + 'break')
+        elif isinstance(node, Continue):
+            out.append(pad + 'continue')
+        elif isinstance(node, Return):
+            if self.assigned is None:
+                out.append(f"{pad}raise _Return({self.expr(node.expr)})")
+            else:
+                out.append(f"{pad}return {self.expr(node.expr)}")
+        else:
+            raise RuntimeError(f"Nó AST desconhecido: {type(node).__name__}")
+
+    def assign(self, node, pad, out):
+        leaves = (Var,) + LITERALS
+        val = self.expr(node.expr)
+        if isinstance(node.var, BinOp) and node.var.op == '[]':
+            # Argumentos: objeto, índice e valor avaliados nessa ordem, uma vez cada
+            obj, idx = self.expr(node.var.l), self.expr(node.var.r)
+            if node.op == '=': out.append(f"{pad}_store({obj}, {idx}, {val})")
+            else: out.append(f"{pad}_update({obj}, {idx}, _ops[{AUG_OPS[node.op]!r}], {val})")
+            return
+        name = node.var.name
+        if node.op != '=':
+            if not isinstance(node.expr, leaves):
+                out.append(f"{pad}_t = {val}")
+                val = '_t'
+            val = self.binop(self.fast.get(node, AUG_OPS[node.op]), self.read(name), val)
+        out.append(f"{pad}v_{name} = {val}")
+        if self.assigned is not None: self.assigned.add(name)
+
+    def funcdef(self, node, ind, out):
+        pad = '    ' * (ind + 1)
+        saved = (self.scope, self.assigned, self.maybe, self.nested)
+        self.scope, self.assigned = self.resolver.scopes[node], set(node.params)
+        self.maybe, self.nested = set(), set()
+        body = []
+        self.block(node.body, ind + 1, body)
+        # Parâmetros repetidos: vale o último, como em eval_node
+        params = [f"_p{i}" if p in node.params[i + 1:] else f"v_{p}" for i, p in enumerate(node.params)]
+        out.append(f"{'    ' * ind}def f_{node.name}({', '.join(params)}):")
+        if self.nested:
+            out.append(f"{pad}global {', '.join('f_' + n for n in sorted(self.nested))}")
+        if self.maybe:
+            out.append(pad + ' = '.join(f"v_{n}" for n in sorted(self.maybe)) + ' = _UNSET')
+        out.extend(body)
+        self.scope, self.assigned, self.maybe, self.nested = saved
+        # FuncDef registra a função na tabela global mesmo dentro de outra função
+        if self.assigned is not None: self.nested.add(node.name)
+
+    def read(self, name):
+        if self.assigned is None: return f"v_{name}"
+        depth, _ = self.resolver.resolve(self.scope, name)
+        if depth == LOCAL:
+            if name in self.assigned: return f"v_{name}"
+            self.maybe.add(name)
+            return f"(v_{name} if v_{name} is not _UNSET else _dyn('v_{name}'))"
+        if depth == GLOBAL: return f"v_{name}"
+        return f"_dyn('v_{name}')"
+
+    def binop(self, op, l, r):
+        # op pode ser uma chave de FAST_OPS: + provado vira o + do Python
+        if op in ('+num', '+str'): return f"({l} + {r})"
+        if op in PY_HELPERS: return f"{PY_HELPERS[op]}({l}, {r})"
+        if op in PY_BINOPS: return f"({l} {PY_BINOPS[op]} {r})"
+        raise RuntimeError(f"Operador binário desconhecido: '{op}'")
+
+    def expr(self, node):
+        if isinstance(node, LITERALS): return repr(node.v)
+        if isinstance(node, Var): return self.read(node.name)
+        if isinstance(node, Array): return f"[{', '.join(self.expr(e) for e in node.elements)}]"
+        if isinstance(node, Object): return '{' + ', '.join(f"{k!r}: {self.expr(v)}" for k, v in node.kv) + '}'
+        if isinstance(node, BinOp): return self.binop(self.fast.get(node, node.op), self.expr(node.l), self.expr(node.r))
+        if isinstance(node, UnaryOp):
+            if node.op in ('!', 'not'): return f"(not {self.expr(node.e)})"
+            if node.op == '-': return f"(-{self.expr(node.e)})"
+            raise RuntimeError(f"Operador unário desconhecido: '{node.op}'")
+        if isinstance(node, FuncCall):
+            args = ', '.join(self.expr(a) for a in node.args)
+            if node.name == 'input': return '_no_args()' if node.args else '_conv(b_input())'
+            if node.name == 'print': return f"b_print({args})"
+            if node.name in BUILTINS:
+                try:
+                    builtin(node.name, len(node.args))
+                    return f"b_{node.name}({args})"
+                except TypeError:
+                    return f"_builtin({node.name!r}, {len(node.args)})({args})"
+            if self.arities.get(node.name, {len(node.args)}) == {len(node.args)}:
+                return f"f_{node.name}({args})"
+            return f"_checked(f_{node.name}, {node.name!r}, {len(node.args)})({args})"
+        raise RuntimeError(f"Nó AST desconhecido: {type(node).__name__}")
+
+def transpile(tree):
+    return PyTranspiler(tree).transpile()
+
+def compile_python(tree):
+    return compile(transpile(tree), PY_FILENAME, 'exec')
+
+def exec_python(code, ns=None):
+    if ns is None: ns = dict(PY_RUNTIME)
+    try:
+        exec(code, ns)
+    except NameError as e:
+        # Globais e funções ausentes chegam como NameError do próprio Python
+        name = getattr(e, 'name', None) or ''
+        if name.startswith('v_'): raise NameError(f"Variável '{name[2:]}' não definida.") from None
+        if name.startswith('f_'): raise NameError(f"Função '{name[2:]}' não definida.") from None
+        raise
+    return ns
+
+# ——————— OTIMIZADOR ——————————————————————————————————————————
+# Passo opcional sobre a AST, antes de qualquer modo de execução (--opt-level):
+#   1: dobra BinOp/UnaryOp sobre literais e elimina ramos de if e laços while
+#      cuja condição é constante;
+#   2: também propaga variáveis globais atribuídas uma única vez a um literal;
+#   3: também calcula uma única vez, antes do laço, as subexpressões de um
+#      while que não dependem de nada que o laço altera.
+# Operações que falhariam (divisão por zero, tipos incompatíveis) ficam como
+# estão, para o erro continuar acontecendo em tempo de execução.
+def count_nodes(node):
+    return sum(1 for _ in walk(node)) if node is not None else 0
+
+def make_literal(v):
+    if isinstance(v, bool): return Boolean(v)
+    if isinstance(v, int) or (isinstance(v, float) and v == v and abs(v) != float('inf')): return Number(v)
+    if isinstance(v, str): return String(v)
+    return None
+
+def shape(node):
+    # Chave estrutural de uma expressão; o tipo dos literais entra (1 != 1.0)
+    if isinstance(node, Node): return (type(node),) + tuple(shape(getattr(node, a)) for a in node.__slots__)
+    if isinstance(node, (list, tuple)): return tuple(map(shape, node))
+    return (type(node), node)
+
+def has_effects(node):
+    """Se a subárvore chama uma função do usuário ou uma nativa impura."""
+    return any(isinstance(n, FuncCall) and not (n.name in BUILTINS and BUILTINS[n.name][2]) for n in walk(node))
+
+class Optimizer:
+    def __init__(self, level=1, keep_globals=False):
+        self.level = level
+        # keep_globals: as variáveis globais ao fim ficam iguais às do código sem
+        # otimizar (API embutível), então nenhuma atribuição do topo sai e nenhum
+        # temporário de invariante é criado fora de funções
+        self.keep_globals = keep_globals
+        self.removed = {}  # categoria -> nós removidos
+        self.hoisted = 0   # variáveis criadas para invariantes de laço (nível 3)
+        self.hoisting = False
+        self.depth = 0     # funções abertas em volta do nó visitado
+
+    def note(self, kind, n):
+        if n: self.removed[kind] = self.removed.get(kind, 0) + n
+
+    def optimize(self, tree):
+        self.before = count_nodes(tree)
+        self.names = {n.name if isinstance(n, Var) else n.var for n in walk(tree) if isinstance(n, (Var, For))}
+        self.names.update(p for n in walk(tree) if isinstance(n, FuncDef) for p in n.params)
+        tree = self.visit(tree)
+        if self.level >= 2:
+            done = set()
+            while True:
+                consts = {n: c for n, c in self.constants(tree).items() if n not in done}
+                if not consts: break
+                done.update(consts)
+                for name, (i, value) in consts.items():
+                    for s in tree.stmts[i + 1:]:
+                        self.propagate(s, name, value)
+                tree = self.visit(tree)
+            if not self.keep_globals: self.drop_dead_constants(tree, done)
+        if self.level >= 3:
+            # Por último, para não retirar o que a propagação ainda dobraria
+            self.hoisting = True
+            tree = self.visit(tree)
+        self.after = count_nodes(tree)
+        return tree
+
+    def report(self):
+        lines = [f"Otimizador (nível {self.level}): {self.before} -> {self.after} nós"]
+        for kind, n in self.removed.items():
+            lines.append(f"  {kind}: {n} nós removidos")
+        if self.hoisted: lines.append(f"  invariantes de laço: {self.hoisted} expressões calculadas antes do laço")
+        return '\n'.join(lines)
+
+    def visit(self, node):
+        meth = getattr(self, 'o_' + type(node).__name__, None)
+        return meth(node) if meth else node
+
+    def fold(self, node, new):
+        self.note('dobramento de constantes', count_nodes(node) - count_nodes(new))
+        return new
+
+    # — dobramento de constantes —
+    def o_BinOp(self, node):
+        node.l, node.r = self.visit(node.l), self.visit(node.r)
+        l, r, op = node.l, node.r, node.op
+        if not isinstance(l, LITERALS): return node
+        if op in ('&&', 'and'): return self.fold(node, r if l.v else l)
+        if op in ('||', 'or'): return self.fold(node, l if l.v else r)
+        if not isinstance(r, LITERALS): return node
+        # Evita materializar valores enormes na compilação
+        if op == '**' and isinstance(r.v, int) and abs(r.v) > 64: return node
+        if op == '*' and (isinstance(l.v, str) or isinstance(r.v, str)): return node
+        try:
+            v = op_index(l.v, r.v) if op == '[]' else BINOPS[op](l.v, r.v)
+        except Exception:
+            return node
+        lit = make_literal(v)
+        return self.fold(node, lit) if lit is not None else node
+
+    def o_UnaryOp(self, node):
+        node.e = self.visit(node.e)
+        if not isinstance(node.e, LITERALS): return node
+        if node.op in ('!', 'not'): return self.fold(node, Boolean(not node.e.v))
+        try:
+            lit = make_literal(-node.e.v)
+        except TypeError:
+            return node
+        return self.fold(node, lit) if lit is not None else node
+
+    def o_Array(self, node):
+        node.elements = [self.visit(e) for e in node.elements]
+        return node
+
+    def o_Object(self, node):
+        node.kv = [(k, self.visit(v)) for k, v in node.kv]
+        return node
+
+    def o_Assign(self, node):
+        if isinstance(node.var, BinOp):
+            node.var.l, node.var.r = self.visit(node.var.l), self.visit(node.var.r)
+        node.expr = self.visit(node.expr)
+        return node
+
+    def o_FuncCall(self, node):
+        node.args = [self.visit(a) for a in node.args]
+        return node
+
+    def o_Return(self, node):
+        node.expr = self.visit(node.expr)
+        return node
+
+    def o_FuncDef(self, node):
+        self.depth += 1
+        node.body = self.visit(node.body)
+        self.depth -= 1
+        return node
+
+    # — eliminação de ramos mortos —
+    def o_Block(self, node):
+        stmts = []
+        for s in node.stmts:
+            s = self.visit(s)
+            if isinstance(s, Block): stmts.extend(s.stmts)  # blocos não criam escopo
+            elif s is not None: stmts.append(s)
+        node.stmts = stmts
+        return node
+
+    def o_If(self, node):
+        node.cond = self.visit(node.cond)
+        if isinstance(node.cond, LITERALS):
+            keep = node.then_block if node.cond.v else node.else_block
+            self.note('ramos mortos', count_nodes(node) - count_nodes(keep))
+            return self.visit(keep) if keep is not None else None
+        node.then_block = self.visit(node.then_block)
+        if node.else_block: node.else_block = self.visit(node.else_block)
+        return node
+
+    def o_While(self, node):
+        node.cond = self.visit(node.cond)
+        if isinstance(node.cond, LITERALS) and not node.cond.v:
+            self.note('ramos mortos', count_nodes(node))
+            return None
+        node.body = self.visit(node.body)
+        return self.hoist(node) if self.hoisting and (self.depth or not self.keep_globals) else node
+
+    def o_For(self, node):
+        node.iter = self.visit(node.iter)
+        node.body = self.visit(node.body)
+        return node
+
+    # — invariantes de laço —
+    # while c ... a * b ... end  vira  if c  _inv1 = a * b  while c ... _inv1 ... end  end
+    # O if repete a condição (que não pode ter efeitos) para nada ser calculado
+    # se o laço não roda. Saem expressões sem chamadas a funções do usuário ou a
+    # nativas impuras, sobre variáveis que o laço não atribui, que a primeira
+    # volta avaliaria antes de qualquer efeito visível: na condição e nas
+    # instruções do topo do corpo até a primeira que não é uma atribuição
+    # simples sem chamadas. Indexação e funções nativas só saem se o corpo não
+    # altera arrays nem objetos. Se a expressão gera erro, ele passa a
+    # acontecer antes da primeira volta.
+    def hoist(self, node):
+        if has_effects(node.cond): return node
+        written, mutates = set(), False
+        for n in walk(node.body):
+            if isinstance(n, Assign):
+                if isinstance(n.var, Var): written.add(n.var.name)
+                else: mutates = True
+            elif isinstance(n, For): written.add(n.var)
+            elif isinstance(n, FuncCall) and not (n.name in BUILTINS and BUILTINS[n.name][2]): mutates = True
+
+        def invariant(e):
+            if isinstance(e, LITERALS): return True
+            if isinstance(e, Var): return e.name not in written
+            if isinstance(e, UnaryOp): return invariant(e.e)
+            if isinstance(e, BinOp): return (e.op != '[]' or not mutates) and invariant(e.l) and invariant(e.r)
+            if isinstance(e, FuncCall): return not mutates and all(map(invariant, e.args))
+            return False     # Array e Object criam um valor novo a cada volta
+
+        found = []
+        def collect(e):
+            if not isinstance(e, (Var,) + LITERALS) and invariant(e):
+                # Só literais: o dobramento já fez o que podia
+                if any(isinstance(n, Var) for n in walk(e)): found.append(e)
+                return
+            if isinstance(e, BinOp) and e.op in ('&&', 'and', '||', 'or'): collect(e.l)
+            elif isinstance(e, (BinOp, UnaryOp, FuncCall, Array, Object)):
+                for c in children(e): collect(c)
+
+        collect(node.cond)
+        for s in node.body.stmts:
+            if isinstance(s, Assign): exprs = [s.expr] if isinstance(s.var, Var) else [s.var.l, s.var.r, s.expr]
+            elif isinstance(s, (If, While)): exprs = [s.cond]
+            elif isinstance(s, For): exprs = [s.iter]
+            elif isinstance(s, Return): exprs = [s.expr]
+            else: break
+            if any(map(has_effects, exprs)): break
+            for e in exprs: collect(e)
+            if not (isinstance(s, Assign) and isinstance(s.var, Var)): break
+        if not found: return node
+
+        temps, pre = {}, []
+        for e in found:
+            key = shape(e)
+            if key in temps: continue
+            temps[key] = name = self.temp()
+            a = Assign(Var(name), '=', e); a.tok = node.tok
+            pre.append(a)
+        guard = tree_from_data(tree_to_data(node.cond))
+        self.substitute(node, temps)
+        out = If(guard, Block(pre + [node]), None); out.tok = node.tok
+        return out
+
+    def temp(self):
+        # Nome novo, que o programa não usa
+        self.hoisted += 1
+        name = f"_inv{self.hoisted}"
+        while name in self.names: name = '_' + name
+        return name
+
+    def substitute(self, node, temps):
+        # Troca cada ocorrência das expressões retiradas pela variável; funções
+        # definidas dentro do laço têm o próprio escopo e ficam como estão
+        stack = [node]
+        while stack:
+            n = stack.pop()
+            if isinstance(n, FuncDef): continue
+            if isinstance(n, Block):   # instruções ficam; só expressões viram variável
+                stack.extend(n.stmts)
+                continue
+            for attr in n.__slots__:
+                v = getattr(n, attr)
+                if isinstance(v, Node) and shape(v) in temps:
+                    setattr(n, attr, Var(temps[shape(v)]))
+                elif isinstance(v, list):
+                    for j, x in enumerate(v):
+                        if isinstance(x, Node) and shape(x) in temps:
+                            v[j] = Var(temps[shape(x)])
+                        elif isinstance(x, tuple) and shape(x[1]) in temps:
+                            v[j] = (x[0], Var(temps[shape(x[1])]))
+            stack.extend(children(n))
+
+    # — propagação de constantes —
+    def constants(self, tree):
+        # Candidatas: atribuição global de topo (executa sempre, antes das
+        # instruções seguintes) a um literal, única atribuição do nome no
+        # programa inteiro e nome que nenhuma função usa como parâmetro.
+        # Nenhuma função pode então definir o nome, e toda leitura nas
+        # instruções seguintes do topo enxerga exatamente esse valor.
+        writes, params = {}, set()
+        for n in walk(tree):
+            if isinstance(n, Assign) and isinstance(n.var, Var):
+                writes[n.var.name] = writes.get(n.var.name, 0) + 1
+            elif isinstance(n, For):
+                writes[n.var] = writes.get(n.var, 0) + 1
+            elif isinstance(n, FuncDef):
+                params.update(n.params)
+        consts = {}
+        for i, s in enumerate(tree.stmts):
+            if (isinstance(s, Assign) and s.op == '=' and isinstance(s.var, Var) and isinstance(s.expr, LITERALS)
+                    and writes[s.var.name] == 1 and s.var.name not in params):
+                consts[s.var.name] = (i, s.expr.v)
+        return consts
+
+    def propagate(self, node, name, value):
+        for n in walk(node):
+            for attr in n.__slots__:
+                v = getattr(n, attr)
+                if isinstance(v, Var) and v.name == name and not (isinstance(n, Assign) and attr == 'var'):
+                    setattr(n, attr, make_literal(value))
+                elif isinstance(v, list):
+                    for j, x in enumerate(v):
+                        if isinstance(x, Var) and x.name == name:
+                            v[j] = make_literal(value)
+                        elif isinstance(x, tuple) and isinstance(x[1], Var) and x[1].name == name:
+                            v[j] = (x[0], make_literal(value))
+
+    def drop_dead_constants(self, tree, names):
+        # A atribuição só sai quando nenhuma leitura do nome sobrou
+        targets = {id(n.var) for n in walk(tree) if isinstance(n, Assign)}
+        read = {n.name for n in walk(tree) if isinstance(n, Var) and id(n) not in targets}
+        stmts = []
+        for s in tree.stmts:
+            if isinstance(s, Assign) and isinstance(s.var, Var) and s.var.name in names and s.var.name not in read:
+                self.note('propagação de constantes', count_nodes(s))
+            else:
+                stmts.append(s)
+        tree.stmts = stmts
+
+# ——————— MEMOIZAÇÃO DE FUNÇÕES PURAS ——————————————————————————————
+# Com --memo, chamadas a funções puras passam por um cache LRU limitado por
+# memória. Uma função é pura quando tem uma única definição no programa, não
+# chama print/input nem funções impuras, não grava em objetos/arrays, não
+# define outras funções e só lê nomes que ela mesma atribuiu antes (senão, pelo
+# escopo dinâmico, o resultado dependeria de quem chamou).
+def pure_functions(tree):
+    defs = collections.Counter(n.name for n in walk(tree) if isinstance(n, FuncDef))
+    pure, calls = set(), {}
+    for d in walk(tree):
+        if not isinstance(d, FuncDef) or defs[d.name] != 1 or unassigned_reads(d.body, d.params):
+            continue
+        callees = set()
+        for n in walk(d.body):
+            if isinstance(n, FuncDef) or isinstance(n, Assign) and not isinstance(n.var, Var): break
+            if isinstance(n, FuncCall):
+                if n.name in BUILTINS:
+                    if not BUILTINS[n.name][2]: break
+                else:
+                    callees.add(n.name)
+        else:
+            pure.add(d.name); calls[d.name] = callees
+    # Ponto fixo: chamar uma função impura (ou inexistente) contamina quem chama
+    changed = True
+    while changed:
+        impure = {name for name in pure if not calls[name] <= pure}
+        pure -= impure
+        changed = bool(impure)
+    return pure
+
+MISSING = object()
+MEMO_TYPES = (int, float, str, bool, type(None))
+
+class Memo:
+    ENTRY_OVERHEAD = 200  # estimativa em bytes do nó do LRU, tuplas da chave etc.
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()   # chave -> (valor, bytes)
+        self.bytes = 0
+        self.stats = {}     # função -> [acertos, faltas]
+
+    def key(self, name, vals):
+        # O tipo entra na chave: f(1), f(1.0) e f(true) podem dar resultados
+        # diferentes. Argumentos não hashable (arrays, objetos) não usam cache.
+        key = (name, tuple(vals), tuple(map(type, vals)))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key):
+        st = self.stats.setdefault(key[0], [0, 0])
+        entry = self.entries.get(key)
+        if entry is None:
+            st[1] += 1
+            return MISSING
+        st[0] += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        # Só valores imutáveis: um array devolvido do cache seria compartilhado
+        if type(value) not in MEMO_TYPES: return
+        size = self.ENTRY_OVERHEAD + sys.getsizeof(value) + sum(map(sys.getsizeof, key[1]))
+        if size > self.max_bytes: return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, old) = self.entries.popitem(last=False)
+            self.bytes -= old
+
+    def report(self):
+        out = [f"{'função':<24} {'acertos':>10} {'faltas':>10} {'taxa':>7}"]
+        for name, (hits, misses) in sorted(self.stats.items(), key=lambda kv: -sum(kv[1])):
+            out.append(f"{name:<24} {hits:>10} {misses:>10} {hits / (hits + misses):>7.1%}")
+        out.append(f"{len(self.entries)} entradas, {self.bytes / 1024:.1f} KB de {self.max_bytes / 1024:.0f} KB")
+        return '\n'.join(out)
+
+# ——————— PROFILER ————————————————————————————————————————————
+# Perfil determinístico (--profile): o Compiler recebe um Profiler e envolve
+# cada instrução com um contador da sua linha e o corpo de cada função com a
+# medição de tempo. Sem --profile nada disso é gerado, então o custo é zero.
+class Profiler:
+    def __init__(self):
+        self.lines = {}     # linha -> execuções
+        self.funcs = {}     # (nome, linha do func) -> [chamadas, ativas, inclusivo, exclusivo]
+        self.stack = []     # tempo gasto nos filhos de cada chamada em andamento
+
+    def line(self, line, stmt):
+        hits = self.lines
+        hits.setdefault(line, 0)
+        def hit(f):
+            hits[line] += 1
+            return stmt(f)
+        return hit
+
+    def func(self, name, line, body):
+        st = self.funcs.setdefault((name, line), [0, 0, 0.0, 0.0])
+        stack, clock = self.stack, time.perf_counter
+        def timed(f):
+            st[0] += 1; st[1] += 1
+            stack.append(0.0)
+            t0 = clock()
+            try:
+                return body(f)
+            finally:
+                dt = clock() - t0
+                st[3] += dt - stack.pop()
+                st[1] -= 1
+                if not st[1]: st[2] += dt  # recursão: só a chamada mais externa conta
+                if stack: stack[-1] += dt
+        return timed
+
+    def to_json(self):
+        return {
+            'funcoes': [{'nome': n, 'linha': l, 'chamadas': c, 'inclusivo_s': inc, 'exclusivo_s': exc}
+                        for (n, l), (c, _, inc, exc) in sorted(self.funcs.items(), key=lambda kv: -kv[1][3])],
+            'linhas': [{'linha': l, 'execucoes': h} for l, h in sorted(self.lines.items())],
+        }
+
+    def report(self, max_lines=20):
+        out = [f"{'função':<30} {'chamadas':>10} {'inclusivo(s)':>13} {'exclusivo(s)':>13}"]
+        for (n, l), (c, _, inc, exc) in sorted(self.funcs.items(), key=lambda kv: -kv[1][3]):
+            label = f"{n} (linha {l})" if l else n
+            out.append(f"{label:<30} {c:>10} {inc:>13.6f} {exc:>13.6f}")
+        out.append('')
+        out.append(f"{'linha':>6} {'execuções':>12}")
+        for l, h in sorted(self.lines.items(), key=lambda kv: (-kv[1], kv[0]))[:max_lines]:
+            out.append(f"{l:>6} {h:>12}")
+        return '\n'.join(out)
+
+# Perfil por amostragem (--sample): uma thread acorda a cada intervalo, pega a
+# pilha de frames Python da thread do interpretador (sys._current_frames) e a
+# traduz para a pilha MiniLang (função:linha), acumulando no formato "collapsed"
+# dos flamegraphs. No modo padrão, o Compiler dá a cada closure de instrução e
+# de chamada uma cópia do code object com o nome de arquivo marcado e a linha
+# MiniLang em co_firstlineno, então a tradução não custa nada na execução; no
+# --tree a linha vem do nó que cada frame de eval_node está avaliando.
+SAMPLE_STMT, SAMPLE_CALL = '<minilang:linha>', '<minilang:chamada>'
+
+class Sampler:
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.counts = {}    # pilha collapsed -> amostras
+        self.done = threading.Event()
+
+    @staticmethod
+    def label(fn, kind, name, line):
+        c, name, line = fn.__code__, name or fn.__name__, line or 1
+        if hasattr(c, 'replace'):
+            code = c.replace(co_filename=kind, co_name=name, co_firstlineno=line)
+        else:  # Python 3.6/3.7: sem CodeType.replace, monta campo a campo
+            code = types.CodeType(c.co_argcount, c.co_kwonlyargcount, c.co_nlocals, c.co_stacksize, c.co_flags,
+                                  c.co_code, c.co_consts, c.co_names, c.co_varnames, kind, name, line,
+                                  c.co_lnotab, c.co_freevars, c.co_cellvars)
+        return types.FunctionType(code, fn.__globals__, code.co_name, fn.__defaults__, fn.__closure__)
+
+    def stack(self, frame):
+        # Linha 0: ainda preparando a chamada (argumentos, frame novo)
+        out, line = [], 0   # do frame mais interno para o mais externo
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename == SAMPLE_STMT:
+                line = line or code.co_firstlineno
+            elif code.co_filename == SAMPLE_CALL:
+                out.append(f"{code.co_name}:{line}" if line else code.co_name)
+                line = code.co_firstlineno
+            elif code is eval_node.__code__:
+                node = frame.f_locals.get('node')
+                if isinstance(node, FuncCall) and node.name not in BUILTINS:
+                    out.append(f"{node.name}:{line}" if line else node.name)
+                    line = 0
+                if node is not None and node.tok: line = line or node.tok.line
+            frame = frame.f_back
+        out.append(f"<módulo>:{line}" if line else '<módulo>')
+        return ';'.join(reversed(out))
+
+    def start(self):
+        tid = threading.get_ident()
+        def loop():
+            while not self.done.wait(self.interval):
+                frame = sys._current_frames().get(tid)
+                if frame is None: break
+                key = self.stack(frame)
+                self.counts[key] = self.counts.get(key, 0) + 1
+        self.thread = threading.Thread(target=loop, name='minilang-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+
+    def collapsed(self):
+        return ''.join(f"{k} {n}\n" for k, n in sorted(self.counts.items()))
+
+# ——————— CACHE EM DISCO ——————————————————————————————————————
+# Como o __pycache__ do Python: a forma já analisada/compilada de cada script
+# fica em __mlcache__/, ao lado do arquivo, e execuções seguintes pulam direto
+# para a execução enquanto o código-fonte não mudar. A chave combina o hash do
+# código, o modo de execução, o nível de otimização e a versão do interpretador
+# (hash deste arquivo + versão do Python). O que se guarda depende do modo: a
+# AST para --tree e closures, o bytecode da VM para --vm e o code object do
+# Python para --py.
+CACHE_DIRNAME = '__mlcache__'
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_SUFFIX = '.mlc'
+
+def interpreter_tag():
+    try:
+        with open(__file__, 'rb') as f:
+            h = hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        h = 'dev'
+    return f"{sys.implementation.cache_tag}-{h}"
+
+class ProgramCache:
+    def __init__(self, directory, max_bytes=CACHE_MAX_BYTES):
+        self.directory, self.max_bytes = directory, max_bytes
+        self.tag = interpreter_tag()
+
+    def key(self, code, *parts):
+        if isinstance(code, str):
+            h = hashlib.sha256(code.encode('utf-8'))
+        else:  # arquivo: hash em blocos, depois volta ao início para o Lexer
+            h = hashlib.sha256()
+            while True:
+                data = code.read(Lexer.CHUNK_SIZE)
+                if not data: break
+                h.update(data.encode('utf-8'))
+            code.seek(0)
+        for p in (self.tag,) + parts: h.update(f"\0{p}".encode('utf-8'))
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def load(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self.path(key))  # marca como usada recentemente (LRU)
+            return data
+        except OSError:
+            return None
+
+    def store(self, key, data):
+        # Escrita atômica: arquivo temporário no mesmo diretório + os.replace
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, self.path(key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self.evict()
+        except OSError:
+            pass  # diretório sem permissão de escrita: segue sem cache
+
+    def evict(self):
+        entries, total = [], 0
+        for e in os.scandir(self.directory):
+            if e.name.endswith(CACHE_SUFFIX):
+                st = e.stat()
+                entries.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+        entries.sort()
+        for _, size, p in entries:
+            if total <= self.max_bytes: break
+            try:
+                os.unlink(p)
+                total -= size
+            except OSError:
+                pass
+
+# A AST vai para o disco como tuplas aninhadas (id do tipo, campos...) via
+# marshal, bem mais rápido de carregar que objetos com __slots__ via pickle.
+NODE_TYPES = (Array, Number, String, Boolean, Var, Object, BinOp, UnaryOp, Assign, Block,
+              If, While, FuncDef, FuncCall, Return, Break, Continue, For)
+NODE_IDS = {t: i for i, t in enumerate(NODE_TYPES)}
+
+def tree_to_data(v):
+    if isinstance(v, Node):
+        d = (NODE_IDS[type(v)],) + tuple(tree_to_data(getattr(v, a)) for a in v.__slots__)
+        return d + ((v.tok.line, v.tok.col),) if v.tok else d
+    if isinstance(v, list): return [tree_to_data(x) for x in v]
+    if isinstance(v, tuple): return tuple(tree_to_data(x) for x in v)
+    return v
+
+def tree_from_data(d):
+    # Nó: tupla que começa com o id do tipo (os construtores recebem os campos
+    # na ordem de __slots__, seguidos da posição se houver); par chave/valor de
+    # Object: tupla que começa com str
+    if isinstance(d, tuple):
+        if d and type(d[0]) is int:
+            cls = NODE_TYPES[d[0]]
+            n = len(cls.__slots__) + 1
+            node = cls(*[tree_from_data(x) for x in d[1:n]])
+            if len(d) > n: node.tok = Token(None, None, *d[n])
+            return node
+        return tuple(tree_from_data(x) for x in d)
+    if isinstance(d, list): return [tree_from_data(x) for x in d]
+    return d
+
+def dump_program(engine, program):
+    if engine == 'vm': return program.dumps()
+    if engine == 'py': return marshal.dumps(program)
+    return marshal.dumps(tree_to_data(program))
+
+def load_program(engine, data):
+    if engine == 'vm': return CodeObject.loads(data)
+    if engine == 'py': return marshal.loads(data)
+    return tree_from_data(marshal.loads(data))
+
+# ——————— API PARA EMBUTIR ————————————————————————————————————
+# Para serviços que executam muitos scripts no mesmo processo: o Interpreter
+# compila cada código uma vez (guardando os Program mais recentes) e cada
+# execução começa com variáveis e funções novas, recebe variáveis globais
+# injetadas e escreve/lê nos destinos indicados, sem tocar em sys.stdout.
+#
+#     interp = Interpreter(stdout=io.StringIO())
+#     prog = interp.compile('total = preco * qtd\nprint(total)')
+#     res = interp.execute(prog, {'preco': 10, 'qtd': 3})
+#     res.ok, res.globals['total'], res.error
+ERRORS = (SyntaxError, NameError, TypeError, ZeroDivisionError, RuntimeError)
+
+class MiniLangError(Exception):
+    """Erro de um programa MiniLang; kind é o tipo do erro original ('SyntaxError', 'NameError'...)."""
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind, self.message = kind, message
+
+    @classmethod
+    def wrap(cls, e):
+        if isinstance(e, ReturnValue): return cls('RuntimeError', "'return' encontrado fora de uma função.")
+        return cls(type(e).__name__, str(e))
+
+class Result:
+    __slots__ = ('globals', 'error')
+    def __init__(self, globals, error=None):
+        # variáveis globais ao fim da execução (ou no ponto do erro); as mesmas em
+        # qualquer opt_level, que não remove atribuições do topo do programa
+        self.globals = globals
+        self.error = error      # MiniLangError ou None
+    @property
+    def ok(self): return self.error is None
+    def __repr__(self):
+        return f"Result(ok={self.ok}, error={self.error!r})" if self.error else f"Result(globals={self.globals!r})"
+
+class Program:
+    """Forma executável de um código (saída de build, já compilada em closures
+    no modo padrão), reutilizável: start() prepara o estado de uma execução."""
+    __slots__ = ('engine', 'code')
+    def __init__(self, engine, code):
+        self.engine, self.code = engine, code
+
+    def start(self, values=None):
+        """Devolve (executar, globais): a execução e a leitura das variáveis globais."""
+        engine, code = self.engine, self.code
+        if engine in ('tree', 'tiered', 'vm'):
+            env = Environment()
+            if values: env.update(values)
+            if engine == 'vm': return (lambda: VM().execute(code, env)), (lambda: dict(env))
+            def tree():
+                if eval_node(code, env, {}) is RETURN: raise ReturnValue(env.retval)
+            return tree, (lambda: dict(env))
+        if engine == 'py':
+            ns = dict(PY_RUNTIME)
+            if values: ns.update(('v_' + k, v) for k, v in values.items())
+            return (lambda: exec_python(code, ns)), (lambda: {k[2:]: v for k, v in ns.items() if k.startswith('v_')})
+        g = module_frame(code.scope, values)
+        return (lambda: code(g)), (lambda: frame_globals(g))
+
+class Interpreter:
+    def __init__(self, engine='closure', opt_level=0, variables=None, stdout=None, stdin=None, max_programs=256):
+        if engine not in ('closure', 'tree', 'tiered', 'vm', 'py'):
+            raise ValueError(f"Modo de execução desconhecido: {engine!r}")
+        self.engine, self.opt_level = engine, opt_level
+        self.variables = dict(variables or {})  # globais injetadas em toda execução
+        self.stdout, self.stdin = stdout, stdin  # None: sys.stdout/sys.stdin
+        self.programs = collections.OrderedDict()  # código -> Program (LRU)
+        self.max_programs = max_programs
+        self.lock = threading.Lock()  # o mesmo Interpreter pode servir várias threads
+
+    def compile(self, code):
+        """Program para o código (string), reaproveitado se já foi compilado; erros de sintaxe levantam MiniLangError."""
+        with self.lock:
+            program = self.programs.get(code)
+            if program is not None:
+                self.programs.move_to_end(code)
+                return program
+        try:
+            with gc_paused():
+                tree = build(code, self.engine, self.opt_level, keep_globals=True)
+                if self.engine == 'closure': tree = Compiler().compile_module(tree)
+                elif self.engine == 'tiered': tree = Tiers().prepare(tree)
+        except ERRORS as e:
+            raise MiniLangError.wrap(e) from None
+        program = Program(self.engine, tree)
+        with self.lock:
+            self.programs[code] = program
+            if len(self.programs) > self.max_programs: self.programs.popitem(last=False)
+        return program
+
+    def execute(self, program, variables=None, stdout=None, stdin=None):
+        """Executa o Program e devolve um Result; erros do programa vão em Result.error."""
+        values = dict(self.variables, **variables) if variables else self.variables
+        run_, read = program.start(values)
+        saved = getattr(STDIO, 'out', None), getattr(STDIO, 'inp', None)
+        STDIO.out, STDIO.inp = stdout or self.stdout, stdin or self.stdin
+        try:
+            run_()
+        except ERRORS + (ReturnValue,) as e:
+            return Result(read(), MiniLangError.wrap(e))
+        finally:
+            ml_flush()
+            STDIO.out, STDIO.inp = saved
+        return Result(read())
+
+    def run(self, code, variables=None, stdout=None, stdin=None):
+        """compile + execute; um erro de sintaxe também volta como Result."""
+        try:
+            program = self.compile(code)
+        except MiniLangError as e:
+            return Result({}, e)
+        return self.execute(program, variables, stdout, stdin)
+
 # ——————— REPL & MAIN —————————————————————————————————————————
-def run(code):
+def build(code, engine, opt_level=0, opt_report=False, types_report=False, keep_globals=False):
+    """Analisa o código (string ou arquivo) e produz a forma que o modo de execução consome."""
+    tree = Parser(Lexer(code).tokenize()).parse()
+    if opt_level:
+        opt = Optimizer(opt_level, keep_globals)
+        tree = opt.optimize(tree)
+        if opt_report: print(opt.report(), file=sys.stderr)
+    if types_report: print(TypeInference(tree).report(), file=sys.stderr)
+    if engine == 'vm': return BytecodeCompiler().compile_module(tree)
+    if engine == 'py': return compile_python(tree)
+    return tree
+
+def cached_build(code, engine, opt_level, cache):
+    key = cache.key(code, engine, opt_level)
+    data = cache.load(key)
+    if data is not None:
+        try:
+            return load_program(engine, data)
+        except Exception:
+            pass  # entrada corrompida ou de formato antigo: recompila
+    program = build(code, engine, opt_level)
     try:
-        toks = list(Lexer(code).tokenize())
-        tree = Parser(toks).parse()
-        global_env = Environment()
-        functions = {}
-        eval_node(tree, global_env, functions)
-    except (SyntaxError, NameError, TypeError, ZeroDivisionError, RuntimeError) as e:
+        data = dump_program(engine, program)
+    except Exception:
+        return program  # ex.: AST funda demais para serializar
+    cache.store(key, data)
+    return program
+
+@contextlib.contextmanager
+def gc_paused():
+    # Análise e compilação só criam estruturas novas (AST, closures); sem o
+    # coletor de ciclos varrendo o heap a cada poucas mil alocações, a
+    # inicialização de scripts grandes fica bem mais rápida.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled: gc.enable()
+
+def run(code, engine='closure', opt_level=0, opt_report=False, types_report=False, cache=None, profiler=None,
+        sampler=None, memo=None, tiers=None, stdout=None, stdin=None):
+    saved = getattr(STDIO, 'out', None), getattr(STDIO, 'inp', None)
+    STDIO.out, STDIO.inp = stdout, stdin
+    try:
+        with gc_paused():
+            if cache is not None and not opt_report and not types_report:
+                program = cached_build(code, engine, opt_level, cache)
+            else:
+                program = build(code, engine, opt_level, opt_report, types_report)
+            if engine == 'closure': program = Compiler(profiler, sampler, memo).compile_module(program)
+            elif engine == 'tiered': program = (tiers or Tiers()).prepare(program)
+        execute, _ = Program(engine, program).start()
+        if sampler: sampler.start()
+        try:
+            execute()
+        finally:
+            if sampler: sampler.stop()
+            ml_flush()  # a saída pendente sai antes da mensagem de erro
+    except ERRORS as e:
         print(f"Erro: {e}", file=sys.stderr)
     except ReturnValue:
         print("Erro: 'return' encontrado fora de uma função.", file=sys.stderr)
+    finally:
+        STDIO.out, STDIO.inp = saved
 
 def main():
-    if len(sys.argv) > 1:
-        try:
-            with open(sys.argv[1], 'r', encoding='utf-8') as f:
-                code = f.read()
-            run(code)
-        except FileNotFoundError:
-            print(f"Erro: Arquivo '{sys.argv[1]}' não encontrado.", file=sys.stderr)
-    else:
-        print("Uso: python3 minilang.py <arquivo.ml>")
+    ap = argparse.ArgumentParser(prog='minilang.py', description='Interpretador da MiniLang.')
+    ap.add_argument('arquivo', nargs='?')
+    ap.add_argument('--tree', action='store_true', help='usa o avaliador de árvore (eval_node) em vez das closures compiladas')
+    ap.add_argument('--vm', action='store_true', help='compila para bytecode e executa na máquina virtual de pilha')
+    ap.add_argument('--py', action='store_true', help='traduz o programa para Python e o executa nativamente')
+    ap.add_argument('--tiered', action='store_true', help='começa no avaliador de árvore e compila em closures as funções e laços que ficam quentes')
+    ap.add_argument('--tier-threshold', type=int, default=TIER_THRESHOLD, metavar='N',
+                    help=f'chamadas de uma função ou voltas de um while até a compilação no --tiered (padrão: {TIER_THRESHOLD})')
+    ap.add_argument('--tier-trace', action='store_true', help='mostra em stderr cada função ou laço compilado pelo --tiered')
+    ap.add_argument('--opt-level', type=int, choices=(0, 1, 2, 3), default=0,
+                    help='otimiza a AST antes de executar: 1 dobra constantes e remove ramos mortos, 2 também propaga constantes, 3 também tira invariantes dos laços')
+    ap.add_argument('--opt-report', action='store_true', help='mostra em stderr quantos nós o otimizador removeu')
+    ap.add_argument('--types', action='store_true', help='mostra em stderr os tipos inferidos de cada variável e quantos + e / dispensam verificação de tipo')
+    ap.add_argument('--no-cache', action='store_true', help=f'não lê nem grava o cache de programas em {CACHE_DIRNAME}/')
+    ap.add_argument('--profile', action='store_true', help='mede chamadas e tempo por função e execuções por linha (modo padrão)')
+    ap.add_argument('--profile-json', metavar='ARQ', help='grava o perfil em JSON em ARQ (implica --profile)')
+    ap.add_argument('--sample', metavar='ARQ', help='amostra a pilha MiniLang periodicamente e grava as pilhas (formato collapsed, para flamegraph) em ARQ')
+    ap.add_argument('--sample-ms', type=float, default=10, metavar='MS', help='intervalo entre amostras de --sample, em milissegundos (padrão: 10)')
+    ap.add_argument('--memo', action='store_true', help='guarda em cache (LRU) os resultados de chamadas a funções puras')
+    ap.add_argument('--memo-mb', type=float, default=16, metavar='MB', help='memória máxima do cache de --memo (padrão: 16)')
+    ap.add_argument('--memo-stats', action='store_true', help='mostra em stderr acertos e faltas do cache de --memo')
+    ap.add_argument('--flush', choices=('linha', 'bloco'),
+                    help='quando a saída é escrita: a cada print (padrão num terminal) ou em blocos de --buffer-kb (padrão em arquivos e pipes)')
+    ap.add_argument('--buffer-kb', type=int, default=64, metavar='KB', help='tamanho dos blocos de saída e de leitura da entrada (padrão: 64)')
+    args = ap.parse_args()
+    profiler = Profiler() if args.profile or args.profile_json else None
+    if profiler and (args.tree or args.tiered or args.vm or args.py):
+        ap.error('--profile só funciona no modo padrão (closures)')
+    sampler = Sampler(args.sample_ms / 1000) if args.sample else None
+    if sampler and (args.tiered or args.vm or args.py):
+        ap.error('--sample só funciona no modo padrão e com --tree')
+    memo = Memo(int(args.memo_mb * 1024 * 1024)) if args.memo else None
+    if memo and (args.tree or args.tiered or args.vm or args.py):
+        ap.error('--memo só funciona no modo padrão (closures)')
+    if args.arquivo is None:
+        print("Uso: python3 minilang.py [opções] <arquivo.ml>")
+        return
+    try:
+        f = open(args.arquivo, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        print(f"Erro: Arquivo '{args.arquivo}' não encontrado.", file=sys.stderr)
+        return
+    engine = 'tree' if args.tree else 'tiered' if args.tiered else 'vm' if args.vm else 'py' if args.py else 'closure'
+    tiers = Tiers(args.tier_threshold, args.tier_trace) if args.tiered else None
+    cache = None if args.no_cache else ProgramCache(os.path.join(os.path.dirname(os.path.abspath(args.arquivo)), CACHE_DIRNAME))
+    flush = args.flush or ('linha' if sys.stdout.isatty() else 'bloco')
+    size = args.buffer_kb * 1024
+    stdout = OutputBuffer(sys.stdout, 0 if flush == 'linha' else size)
+    # O arquivo é lido em blocos direto pelo Lexer, sem montar o texto inteiro
+    with f:
+        run(f, engine=engine, opt_level=args.opt_level, opt_report=args.opt_report, types_report=args.types, cache=cache,
+            profiler=profiler, sampler=sampler, memo=memo, tiers=tiers, stdout=stdout, stdin=InputReader(sys.stdin, size))
+    if memo and args.memo_stats:
+        print(memo.report(), file=sys.stderr)
+    if sampler:
+        with open(args.sample, 'w', encoding='utf-8') as out:
+            out.write(sampler.collapsed())
+    if profiler:
+        print(profiler.report(), file=sys.stderr)
+        if args.profile_json:
+            with open(args.profile_json, 'w', encoding='utf-8') as out:
+                json.dump(profiler.to_json(), out, ensure_ascii=False, indent=2)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
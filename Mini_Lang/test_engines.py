@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+test_engines.py — Testes diferenciais dos modos de execução da MiniLang
+
+Cada exemplo *.minilang e cada caso de CASOS roda com o avaliador de árvore
+(--tree), que é a referência, e com cada modo de ENGINES; a saída e as
+mensagens de erro têm de ser idênticas. Roda com pytest ou direto:
+
+    python3 -m pytest -q test_engines.py
+    python3 test_engines.py
+"""
+
+import os
+import sys
+import glob
+import json
+import random
+import tempfile
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MINILANG = os.path.join(HERE, 'minilang.py')
+
+# modo -> opções de linha de comando
+ENGINES = {
+    'closure': [],
+    'vm': ['--vm'],
+    'py': ['--py'],
+    'tiered': ['--tiered'],
+    'tiered_1': ['--tiered', '--tier-threshold', '1'],   # compila tudo na primeira chamada
+}
+
+# Entrada dada aos exemplos que chamam input()
+SAMPLE_INPUT = '10\n'
+
+# nome -> (código, entrada)
+CASOS = {
+    'erro_divisao': ('x = 1\nprint(x / 0)\n', ''),
+    'escopo_dinamico': ('''
+func f()
+    return y * 2
+end func
+func g(y)
+    return f() + 1
+end func
+print(g(20))
+''', ''),
+    # Builtin como instrução: o valor devolvido não pode encerrar o bloco
+    'builtin_instrucao': ('''
+func f(a)
+    len(a)
+    print("depois")
+    return 5
+end func
+print(f([1, 2]))
+''', ''),
+    # push devolve o array; como instrução dentro de laços e funções, o valor é descartado
+    'push_em_laco': ('''
+func enche(a, n)
+    i = 0
+    while i < n
+        push(a, i)
+        i += 1
+    end while
+    for x in range(2)
+        push(a, x * 10)
+    end for
+    return a
+end func
+b = enche([], 3)
+print(b)
+j = 0
+while j < 2
+    push(b, j)
+    j = j + 1
+end while
+print(b)
+''', ''),
+    # '\r' antes do '\n' fica na linha lida, como no input() do Python
+    'entrada_crlf': ('''
+x = input()
+print(x, x + 1)
+y = input()
+print(len(y))
+''', '41\r\nab\r\n'),
+    # Comparação de numarrays como condição é erro em todos os modos
+    'numarray_condicao': ('''
+a = numarray([1, 2, 3])
+b = numarray([1, 5, 3])
+print(sum(a == b) == len(a), sum(a == b) > 0)
+if a == b
+    print("iguais")
+end if
+''', ''),
+}
+
+def execute(path, opts, stdin, cache=False):
+    r = subprocess.run([sys.executable, MINILANG] + ([] if cache else ['--no-cache']) + opts + [path], input=stdin, timeout=60,
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    return r.stdout + r.stderr
+
+def programs(tmp):
+    """(nome, caminho, entrada) de cada exemplo e de cada caso de CASOS, estes gravados em tmp."""
+    out = [(os.path.basename(p), p, SAMPLE_INPUT) for p in sorted(glob.glob(os.path.join(HERE, '*.minilang')))]
+    for name, (src, stdin) in CASOS.items():
+        path = os.path.join(tmp, name + '.ml')
+        with open(path, 'w', encoding='utf-8') as f: f.write(src)
+        out.append((name, path, stdin))
+    return out
+
+def test_engines():
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, path, stdin in programs(tmp):
+            expected = execute(path, ['--tree'], stdin)
+            for engine, opts in ENGINES.items():
+                got = execute(path, opts, stdin)
+                if got != expected:
+                    failures.append(f"{name} [{engine}]\n  --tree: {expected!r}\n  {engine}: {got!r}")
+    assert not failures, '\n'.join(failures)
+
+def test_input_crlf():
+    # Linha terminada em '\r\n': o '\r' fica e '41\r' vira real
+    with tempfile.TemporaryDirectory() as tmp:
+        name, path, stdin = [p for p in programs(tmp) if p[0] == 'entrada_crlf'][0]
+        assert execute(path, [], stdin) == '41.0 42.0\n3\n'
+
+def test_profile_lines():
+    # Cada instrução conta na própria linha, não na última instrução aninhada
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'perfil.json')
+        execute(os.path.join(HERE, 'fatorial_recursivo.minilang'), ['--profile-json', out], '')
+        with open(out, encoding='utf-8') as f:
+            lines = {l['linha']: l['execucoes'] for l in json.load(f)['linhas']}
+    assert lines[5] == 1 and lines[7] == 13 and lines[8] == 3 and lines[12] == 10, lines
+
+def test_interpreter_globals():
+    # As globais que a API devolve não dependem do nível de otimização
+    sys.path.insert(0, HERE)
+    from minilang import Interpreter
+    src = """
+a = [1, 2, 3]
+k = 3
+t = 0
+i = 0
+while i < m
+    t += len(a) * m + k
+    i += 1
+end while
+"""
+    for engine in ('closure', 'vm', 'py', 'tree', 'tiered'):
+        results = [Interpreter(engine, l, {'m': 4}).run(src).globals for l in range(4)]
+        assert all(g == results[0] for g in results), (engine, results)
+
+def test_incremental_parser():
+    # Edições aleatórias (cada uma seguida de sua reversão): a árvore de edit()
+    # tem de ser a de uma análise completa do mesmo texto, posições incluídas
+    sys.path.insert(0, HERE)
+    from minilang import IncrementalParser, Parser, Lexer, tree_to_data
+    snippets = ['', '', '\n', '(', ')', 'x', ' + 1', '1', '"s"', ' = ', '+= ', '[', ']', '@', 'print(2)\n',
+                'if x > 1\n', 'end if\n', 'else\n', 'while i < 3\n', 'end while\n', 'func g(a)\n', 'end func\n', 'return 1\n']
+    sources = [open(p, encoding='utf-8').read() for p in sorted(glob.glob(os.path.join(HERE, '*.minilang')))]
+    sources += ['i = 0\ni += 1\nprint(2)', 'x = 1\nif x > 0\n    print(x)\nend if\ny = 2']
+
+    def parse(text):
+        try: return tree_to_data(Parser(Lexer(text).tokenize()).parse())
+        except SyntaxError: return 'erro'
+
+    def edit(doc, *args):
+        try: return tree_to_data(doc.edit(*args))
+        except SyntaxError: return 'erro'
+
+    rnd = random.Random(2024)
+    for _ in range(150):
+        doc = IncrementalParser(rnd.choice(sources))
+        for _ in range(15):
+            lines, before = doc.lines, doc.text
+            a = rnd.randrange(len(lines)); b = min(len(lines) - 1, a + rnd.choice([0, 0, 0, 1]))
+            ca, cb = rnd.randint(1, len(lines[a]) + 1), rnd.randint(1, len(lines[b]) + 1)
+            if a == b and cb < ca: ca, cb = cb, ca
+            old = '\n'.join(lines[a:b + 1])
+            old = old[ca - 1:len(old) - (len(lines[b]) - cb + 1)]
+            text = rnd.choice(snippets)
+            assert edit(doc, a + 1, ca, b + 1, cb, text) == parse(doc.text), (before, (a + 1, ca, b + 1, cb, text))
+            parts = text.split('\n')
+            end_col = len(parts[-1]) + (ca if len(parts) == 1 else 1)
+            assert edit(doc, a + 1, ca, a + len(parts), end_col, old) == parse(before), (doc.text, 'reversão')
+            assert doc.text == before
+
+def test_program_cache():
+    # A segunda execução do mesmo código, modo e nível lê o cache (a entrada
+    # não é regravada: mesmo inode); mudar o código ou o nível é uma falta
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'prog.ml')
+        cache_dir = os.path.join(tmp, '__mlcache__')
+        def entries():
+            return {e.name: e.inode() for e in os.scandir(cache_dir) if e.name.endswith('.mlc')}
+        def run(src, opts):
+            with open(path, 'w', encoding='utf-8') as f: f.write(src)
+            return execute(path, opts, '', cache=True)
+
+        src = 'x = 2\nprint(x * 21)\n'
+        assert run(src, []) == '42\n'
+        first = entries()
+        assert len(first) == 1
+        assert run(src, []) == '42\n' and entries() == first
+        assert run(src, ['--opt-level', '2']) == '42\n' and len(entries()) == 2
+        assert run(src.replace('21', '20'), []) == '40\n' and len(entries()) == 3
+        # Entrada corrompida: recompila e regrava
+        name = next(iter(first))
+        with open(os.path.join(cache_dir, name), 'wb') as f: f.write(b'lixo')
+        assert run(src, []) == '42\n' and entries()[name] != first[name]
+
+    # Acima do limite saem as entradas usadas há mais tempo
+    sys.path.insert(0, HERE)
+    from minilang import ProgramCache
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ProgramCache(tmp, max_bytes=35)   # cabem três entradas de 10 bytes
+        for i, key in enumerate('abc'):
+            cache.store(key, b'0123456789')
+            os.utime(cache.path(key), (i, i))
+        assert cache.load('a') == b'0123456789'   # 'a' passa a ser a mais recente
+        cache.store('d', b'0123456789')
+        assert sorted(e.name for e in os.scandir(tmp)) == ['a.mlc', 'c.mlc', 'd.mlc']
+
+def test_memo_pure_functions():
+    # Só entram no --memo funções que não leem variáveis de quem chama (escopo
+    # dinâmico), sem efeitos e que só chamam funções puras
+    sys.path.insert(0, HERE)
+    from minilang import Parser, Lexer, Memo, pure_functions
+    src = """
+func quadrado(n)
+    return n * n
+end func
+func escopo(n)
+    return n + y
+end func
+func mostra(n)
+    print(n)
+    return n
+end func
+func empilha(a)
+    push(a, 1)
+    return a
+end func
+func chama_mostra(n)
+    return mostra(n) + quadrado(n)
+end func
+"""
+    assert pure_functions(Parser(Lexer(src).tokenize()).parse()) == {'quadrado'}
+    memo = Memo(1 << 20)
+    assert memo.key('f', [3]) != memo.key('f', [3.0]) != memo.key('f', [True])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'memo.ml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('func metade(n)\n    return n / 2\nend func\nprint(metade(3), metade(3.0), metade(3))\n')
+        assert execute(path, ['--memo'], '') == execute(path, ['--tree'], '') == '1 1.5 1\n'
+
+if __name__ == '__main__':
+    tests = [(n, fn) for n, fn in sorted(globals().items()) if n.startswith('test_') and callable(fn)]
+    failed = 0
+    for n, fn in tests:
+        try:
+            fn()
+            print(f"ok    {n}")
+        except AssertionError as e:
+            failed += 1
+            print(f"FALHA {n}\n{e}")
+    sys.exit(1 if failed else 0)